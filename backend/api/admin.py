@@ -0,0 +1,85 @@
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .models import OutboxEvent, RequestProfile, SlowQuery
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'created_at', 'method', 'path', 'status_code',
+        'duration_ms', 'query_count', 'sql_time_ms', 'download')
+    list_filter = ('method', 'status_code')
+    search_fields = ('path',)
+    exclude = ('stats',)
+    readonly_fields = (
+        'created_at', 'method', 'path', 'status_code', 'user',
+        'duration_ms', 'query_count', 'sql_time_ms', 'summary',
+        'queries', 'download')
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Файл pstats')
+    def download(self, obj):
+        return format_html(
+            '<a href="{}">{}.prof</a>',
+            reverse('admin:api_requestprofile_download', args=(obj.pk,)),
+            obj.pk)
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='api_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(
+            bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = (
+            f'attachment; filename=profile_{pk}.prof')
+        return response
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'created_at', 'view', 'duration_ms', 'fingerprint')
+    list_filter = ('view',)
+    search_fields = ('fingerprint', 'statement')
+    readonly_fields = (
+        'created_at', 'fingerprint', 'view', 'duration_ms', 'origin',
+        'statement', 'sql', 'params', 'plan')
+
+    def has_add_permission(self, request):
+        return False
+
+
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'topic', 'key', 'status', 'attempts', 'created_at',
+        'available_at')
+    list_filter = ('status', 'topic')
+    search_fields = ('key',)
+    readonly_fields = (
+        'topic', 'key', 'payload', 'status', 'attempts', 'error',
+        'created_at', 'available_at')
+    actions = ('requeue',)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Вернуть в очередь')
+    def requeue(self, request, queryset):
+        queryset.update(
+            status=OutboxEvent.PENDING, attempts=0,
+            available_at=timezone.now())
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
+admin.site.register(SlowQuery, SlowQueryAdmin)
+admin.site.register(OutboxEvent, OutboxEventAdmin)
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import checks, idempotency, profiling  # noqa: F401
+        # Обращаться к БД в ready() нельзя, поэтому здесь только
+        # прогрев структур в памяти; кеши заполняет хук gunicorn.
+        if settings.WARMUP_ON_READY:
+            from .warmup import warmup
+            warmup(prime=False)
@@ -0,0 +1,50 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_cache_key(key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'auth:token-user:{digest}'
+
+
+def invalidate_token(key):
+    """Удаление токена из общего кеша после коммита транзакции.
+
+    До коммита токен и пользователь в БД ещё прежние, и параллельный
+    запрос снова положил бы их в кеш.
+    """
+    transaction.on_commit(lambda: cache.delete(token_cache_key(key)))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену без запроса к БД на каждый запрос.
+
+    В общем кеше хранится только id владельца токена: хеш пароля и
+    прочие данные пользователя туда не попадают. Пользователь
+    собирается без запроса, остальные поля дочитываются из БД при
+    первом обращении. Локальная копия в процессе пережила бы удаление
+    токена, сделанное другим воркером, поэтому её нет.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        user_id = cache.get(cache_key)
+        if user_id is None:
+            user, _ = super().authenticate_credentials(key)
+            user_id = user.pk
+            cache.set(cache_key, user_id, settings.TOKEN_CACHE_TIMEOUT)
+        # Неактивный пользователь в кеш не попадает: базовый класс
+        # отклоняет его, а изменение пользователя сбрасывает кеш.
+        User = get_user_model()
+        user = User.from_db(
+            User.objects.db, ['id', 'is_active'], [user_id, True])
+        Token = self.get_model()
+        token = Token.from_db(
+            Token.objects.db, ['key', 'user_id'], [key, user_id])
+        token.user = user
+        return (user, token)
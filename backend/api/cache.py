@@ -0,0 +1,89 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from .compression import IDENTITY, choose_encoding, compressed_variants
+
+
+def catalogue_version_key(name):
+    return f'catalogue:{name}:version'
+
+
+def initial_version():
+    # Версия, вытесненная из memcached, начинается заново не с 1,
+    # а с текущего времени, чтобы не совпасть со старыми ключами.
+    return int(time.time() * 1000)
+
+
+def get_catalogue_version(name):
+    return cache.get_or_set(catalogue_version_key(name), initial_version, None)
+
+
+def bump_catalogue_version(name):
+    """Сброс всех закешированных ответов каталога после коммита.
+
+    До коммита параллельный запрос закешировал бы старые данные
+    уже под новой версией.
+    """
+    key = catalogue_version_key(name)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), None)
+    transaction.on_commit(bump)
+
+
+def get_count_version(model):
+    return get_catalogue_version(f'count:{model._meta.label_lower}')
+
+
+def bump_count_version(model):
+    """Сброс закешированных количеств строк после записи в таблицу."""
+    bump_catalogue_version(f'count:{model._meta.label_lower}')
+
+
+def catalogue_cache_key(name, query_string):
+    digest = hashlib.md5(query_string.encode()).hexdigest()
+    return f'catalogue:{name}:{get_catalogue_version(name)}:{digest}'
+
+
+class CatalogueCacheMixin:
+    """Миксин для справочников: ответ рендерится и сжимается один раз,
+    а затем отдаётся из кеша в подходящей клиенту кодировке.
+    """
+    catalogue_name = None
+
+    def get_catalogue_variants(self, request, *args, **kwargs):
+        key = catalogue_cache_key(
+            self.catalogue_name, request.META.get('QUERY_STRING', ''))
+        variants = cache.get(key)
+        if variants is None:
+            response = super().list(request, *args, **kwargs)
+            variants = compressed_variants(
+                JSONRenderer().render(response.data))
+            cache.set(key, variants, settings.CATALOGUE_CACHE_TIMEOUT)
+        return variants
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        variants = self.get_catalogue_variants(request, *args, **kwargs)
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding not in variants:
+            encoding = IDENTITY
+        response = HttpResponse(
+            variants[encoding], content_type='application/json')
+        if encoding != IDENTITY:
+            response['Content-Encoding'] = encoding
+        if len(variants) > 1:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
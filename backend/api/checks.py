@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии кешей, токены и троттлинг должны быть общими для воркеров."""
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'Кеш по умолчанию не общий для процессов.',
+        hint='LocMemCache подходит только для разработки. Укажите '
+             'CACHE_BACKEND и CACHE_LOCATION общего кеша (memcached).',
+        id='api.W001',
+    )]
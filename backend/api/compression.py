@@ -0,0 +1,74 @@
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+GZIP = 'gzip'
+BROTLI = 'br'
+IDENTITY = 'identity'
+
+
+def available_encodings():
+    """Кодировки, которые сервер умеет отдавать, в порядке предпочтения."""
+    if brotli is not None:
+        return (BROTLI, GZIP)
+    return (GZIP,)
+
+
+def parse_accept_encoding(header):
+    """Разбор заголовка Accept-Encoding в словарь {кодировка: q}."""
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    """Выбор лучшей кодировки для клиента или None."""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    """Сжатие байтов выбранной кодировкой."""
+    if encoding == BROTLI:
+        return brotli.compress(
+            content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(
+        content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def compressed_variants(content):
+    """Все варианты содержимого: исходный и сжатые, если они короче."""
+    variants = {IDENTITY: content}
+    if len(content) < settings.COMPRESSION_MIN_LENGTH:
+        return variants
+    for encoding in available_encodings():
+        compressed = compress(content, encoding)
+        if len(compressed) < len(content):
+            variants[encoding] = compressed
+    return variants
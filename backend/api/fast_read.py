@@ -0,0 +1,241 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import Http404
+from rest_framework.response import Response
+
+from recipes.models import (
+    Favorite, IngredientAmount, Recipe, RecipeDocument, ShoppingCart, Tag)
+from users.models import Follow, User
+from .cache import get_catalogue_version
+from .fields import get_requested_fields
+from .serializers import RecipeReadSerializer
+
+COLUMNS = ('name', 'image', 'text', 'cooking_time')
+DOCUMENT_FIELDS = (
+    'id', 'author', 'name', 'image', 'text', 'ingredients', 'tags',
+    'cooking_time')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'slug', 'color')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+
+
+def ordered(item, keys):
+    # jsonb в PostgreSQL не хранит порядок ключей.
+    return {key: item[key] for key in keys}
+
+
+def get_tags_by_id():
+    """Словарь тегов по id, общий для всех запросов до изменения тегов."""
+    key = f'catalogue:tags:{get_catalogue_version("tags")}:by_id'
+    tags = cache.get(key)
+    if tags is None:
+        tags = {
+            tag['id']: tag
+            for tag in Tag.objects.values(*TAG_FIELDS)
+        }
+        cache.set(key, tags, settings.CATALOGUE_CACHE_TIMEOUT)
+    return tags
+
+
+def get_user_flags(request, recipe_ids, author_ids, fields):
+    """Множества избранного, корзины и подписок для текущего пользователя.
+
+    Повторяет семантику SerializerMethodField: без запроса флаги None,
+    для анонимного пользователя False. Запрашиваются только флаги
+    выбранных полей.
+    """
+    user = request.user if request else None
+    if user is None or not user.is_authenticated:
+        return None
+    favorites = cart = follows = set()
+    if 'is_favorited' in fields:
+        favorites = set(Favorite.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).order_by().values_list('recipe_id', flat=True))
+    if 'is_in_shopping_cart' in fields:
+        cart = set(ShoppingCart.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).order_by().values_list('recipe_id', flat=True))
+    if 'author' in fields:
+        follows = set(Follow.objects.filter(
+            user=user, author_id__in=author_ids
+        ).order_by().values_list('author_id', flat=True))
+    return favorites, cart, follows
+
+
+def get_all_user_flags(user):
+    """Все id избранного, корзины и авторов из подписок пользователя."""
+    if not user.is_authenticated:
+        return None
+    return (
+        set(Favorite.objects.filter(user=user).order_by().values_list(
+            'recipe_id', flat=True)),
+        set(ShoppingCart.objects.filter(user=user).order_by().values_list(
+            'recipe_id', flat=True)),
+        set(Follow.objects.filter(user=user).order_by().values_list(
+            'author_id', flat=True)),
+    )
+
+
+def image_url(name, request):
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def build_documents(recipe_ids, fields=DOCUMENT_FIELDS):
+    """Не зависящая от пользователя часть вывода RecipeReadSerializer.
+
+    Картинка отдаётся URL хранилища без хоста, автор — без
+    is_subscribed. Запросы для невыбранных полей не выполняются.
+    """
+    columns = [name for name in COLUMNS if name in fields]
+    recipes = {
+        row['id']: row for row in Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).order_by().values('id', 'author_id', *columns)
+    }
+    authors = {}
+    if 'author' in fields:
+        authors = {
+            author['id']: author for author in User.objects.filter(
+                pk__in={row['author_id'] for row in recipes.values()}
+            ).order_by().values(*AUTHOR_FIELDS)
+        }
+    tags = defaultdict(list)
+    if 'tags' in fields:
+        all_tags = get_tags_by_id()
+        for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipes
+        ).order_by('tag__name').values_list('recipe_id', 'tag_id'):
+            tags[recipe_id].append(all_tags[tag_id])
+    ingredients = defaultdict(list)
+    if 'ingredients' in fields:
+        for recipe_id, *ingredient in IngredientAmount.objects.filter(
+            recipe_id__in=recipes
+        ).order_by('ingredient__name').values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        ):
+            ingredients[recipe_id].append(
+                dict(zip(INGREDIENT_FIELDS, ingredient)))
+    renderers = {
+        'id': lambda row: row['id'],
+        'author': lambda row: authors[row['author_id']],
+        'name': lambda row: row['name'],
+        'image': lambda row: image_url(row['image'], None),
+        'text': lambda row: row['text'],
+        'ingredients': lambda row: ingredients[row['id']],
+        'tags': lambda row: [dict(tag) for tag in tags[row['id']]],
+        'cooking_time': lambda row: row['cooking_time'],
+    }
+    return {
+        pk: {
+            name: renderers[name](row)
+            for name in DOCUMENT_FIELDS if name in fields
+        }
+        for pk, row in recipes.items()
+    }
+
+
+def get_documents(recipe_ids, fields):
+    """Документы из RecipeDocument; недостающие собираются на лету."""
+    if not settings.RECIPE_DOCUMENTS:
+        return build_documents(recipe_ids, fields)
+    documents = dict(RecipeDocument.objects.filter(
+        recipe_id__in=recipe_ids).values_list('recipe_id', 'document'))
+    missing = set(recipe_ids) - documents.keys()
+    if missing:
+        documents.update(build_documents(missing, fields))
+    return documents
+
+
+def serialize_recipes(recipe_ids, request, fields=None, flags=None):
+    """Тот же JSON, что у RecipeReadSerializer, но без моделей и полей DRF.
+
+    Порядок тегов и ингредиентов задаёт БД (как и Meta.ordering в
+    исходном сериализаторе), поэтому вывод совпадает побайтно.
+    К документам рецептов добавляются только флаги пользователя;
+    уже загруженные флаги можно передать в flags.
+    """
+    if fields is None:
+        fields = RecipeReadSerializer.Meta.fields
+    documents = get_documents(recipe_ids, fields)
+    author_ids = set()
+    if 'author' in fields:
+        author_ids = {
+            document['author']['id'] for document in documents.values()}
+    if flags is None:
+        flags = get_user_flags(
+            request, list(documents), author_ids, fields)
+    default = None if request is None else False
+    renderers = {
+        'author': lambda pk, document: dict(
+            ordered(document['author'], AUTHOR_FIELDS),
+            is_subscribed=(
+                document['author']['id'] in flags[2]
+                if flags else default)),
+        'image': lambda pk, document: (
+            request.build_absolute_uri(document['image'])
+            if request is not None and document['image']
+            else document['image']),
+        'ingredients': lambda pk, document: [
+            ordered(item, INGREDIENT_FIELDS)
+            for item in document['ingredients']],
+        'tags': lambda pk, document: [
+            ordered(tag, TAG_FIELDS) for tag in document['tags']],
+        'is_favorited': lambda pk, document: (
+            pk in flags[0] if flags else default),
+        'is_in_shopping_cart': lambda pk, document: (
+            pk in flags[1] if flags else default),
+    }
+    return [
+        {
+            name: (renderers[name](pk, documents[pk]) if name in renderers
+                   else documents[pk][name])
+            for name in fields
+        }
+        for pk in recipe_ids if pk in documents
+    ]
+
+
+class FastRecipeReadMixin:
+    """Быстрое чтение рецептов: страница выбирается как список id,
+    ответ собирается из values() без создания объектов моделей.
+    """
+
+    def use_fast_read(self):
+        return settings.RECIPE_FAST_READ
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().list(request, *args, **kwargs)
+        fields = get_requested_fields(
+            request, RecipeReadSerializer.Meta.fields)
+        queryset = self.filter_queryset(
+            self.get_queryset()).values_list('pk', flat=True)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(
+                serialize_recipes(list(queryset), request, fields))
+        return self.get_paginated_response(
+            serialize_recipes(list(page), request, fields))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+        data = serialize_recipes([pk], request, get_requested_fields(
+            request, RecipeReadSerializer.Meta.fields))
+        if not data:
+            raise Http404
+        return Response(data[0])
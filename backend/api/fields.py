@@ -0,0 +1,63 @@
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def split_param(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_requested_fields(request, available):
+    """Поля ответа по параметрам fields и omit (имена через запятую).
+
+    Возвращает None, если параметров нет, иначе поля из available
+    в исходном порядке. Действует только на верхний уровень ответа.
+    """
+    if request is None:
+        return None
+    params = request.query_params
+    if FIELDS_PARAM not in params and OMIT_PARAM not in params:
+        return None
+    requested = split_param(params.get(FIELDS_PARAM, ''))
+    omitted = split_param(params.get(OMIT_PARAM, ''))
+    unknown = set(requested + omitted) - set(available)
+    if unknown:
+        raise ValidationError({
+            FIELDS_PARAM: 'Неизвестные поля: '
+                          f'{", ".join(sorted(unknown))}.'
+        })
+    return tuple(
+        name for name in available
+        if (not requested or name in requested) and name not in omitted
+    )
+
+
+class SparseFieldsSerializerMixin:
+    """Сериализатор, который принимает fields и выбрасывает лишние поля.
+
+    SerializerMethodField выброшенных полей не вызываются.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsMixin:
+    """Миксин вьюсета: fields/omit для GET-запросов."""
+
+    def get_requested_fields(self, serializer_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        return get_requested_fields(
+            self.request, serializer_class.Meta.fields)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if (self.request.method == 'GET' and issubclass(
+                serializer_class, SparseFieldsSerializerMixin)):
+            kwargs.setdefault(
+                'fields', self.get_requested_fields(serializer_class))
+        return super().get_serializer(*args, **kwargs)
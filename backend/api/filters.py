@@ -1,16 +1,48 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, When
+from django.db.models.functions import Lower
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
 
-from recipes.models import Recipe, Tag
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
 from users.models import User
+from foodgram import constants
+from .cache import get_catalogue_version
+
+
+TAGS_ANY = 'any'
+TAGS_ALL = 'all'
+
+
+def get_tag_ids_by_slug():
+    """Словарь slug -> id тегов, общий до изменения справочника."""
+    key = f'catalogue:tags:{get_catalogue_version("tags")}:by_slug'
+    tags = cache.get(key)
+    if tags is None:
+        tags = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tags, settings.CATALOGUE_CACHE_TIMEOUT)
+    return tags
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
 
 
 class RecipeFilter(FilterSet):
-    """Фильтр для рецептов."""
+    """Фильтр для рецептов.
+
+    Теги и флаги пользователя проверяются подзапросами EXISTS, поэтому
+    рецепт попадает в выдачу один раз и DISTINCT не нужен.
+    """
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all())
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='tags_filter')
+    tags_mode = filters.ChoiceFilter(
+        choices=((TAGS_ANY, TAGS_ANY), (TAGS_ALL, TAGS_ALL)),
+        method='tags_mode_filter')
     is_favorited = filters.BooleanFilter(
         method='is_favorited_filter')
     is_in_shopping_cart = filters.BooleanFilter(
@@ -20,14 +52,66 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('tags', 'author',)
 
+    def tags_filter(self, queryset, name, value):
+        tag_ids = get_tag_ids_by_slug()
+        ids = [tag_ids[slug] for slug in value if slug in tag_ids]
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_mode') == TAGS_ALL:
+            for tag_id in ids:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag_id=tag_id)))
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag_id__in=ids)))
+
+    def tags_mode_filter(self, queryset, name, value):
+        return queryset
+
     def is_favorited_filter(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(favorites__user=user)
+            return queryset.filter(Exists(Favorite.objects.filter(
+                user=user, recipe_id=OuterRef('pk'))))
         return queryset
 
     def is_in_shopping_cart_filter(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(shoppings_cart__user=user)
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                user=user, recipe_id=OuterRef('pk'))))
         return queryset
+
+
+class UserSearchFilter(BaseFilterBackend):
+    """Поиск пользователей по началу username, имени или фамилии.
+
+    Сравнение идёт по lower(поле) LIKE 'префикс%', что покрывается
+    функциональными индексами с text_pattern_ops. Точное совпадение
+    username выше префиксного, совпадение по имени ниже; выдача
+    ограничена MAX_USER_SEARCH_RESULTS. Действует только на список:
+    по срезу нельзя искать объект детальной страницы.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    search_fields = ('username', 'first_name', 'last_name')
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term or getattr(view, 'action', None) != 'list':
+            return queryset
+        term = term.lower()
+        queryset = queryset.annotate(**{
+            f'{field}_lower': Lower(field) for field in self.search_fields
+        })
+        matches = Q()
+        for field in self.search_fields:
+            matches |= Q(**{f'{field}_lower__startswith': term})
+        return queryset.filter(matches).annotate(
+            search_rank=Case(
+                When(username_lower=term, then=0),
+                When(username_lower__startswith=term, then=1),
+                default=2,
+                output_field=IntegerField(),
+            )
+        ).order_by(
+            'search_rank', 'username'
+        )[:constants.MAX_USER_SEARCH_RESULTS]
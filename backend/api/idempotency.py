@@ -0,0 +1,149 @@
+import hashlib
+import time
+import zlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from foodgram import constants
+from recipes.utils import delete_older_than
+from .models import IdempotencyRecord
+from .outbox import periodic
+
+# Заголовки, которые выставляет сам ответ при повторе.
+SKIPPED_HEADERS = {'content-type', 'content-length'}
+
+
+def request_fingerprint(request):
+    body = hashlib.sha256(request.body).hexdigest()
+    return hashlib.sha256(
+        f'{request.method}:{request.path}:{body}'.encode()).hexdigest()
+
+
+def expired_before():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_TTL)
+
+
+def claim(user, key, fingerprint):
+    """Запись для ключа: (True, запись), если ключ занят этим запросом.
+
+    Уникальный индекс (user, key) пропускает только один из
+    параллельных запросов, в том числе с разных воркеров. Просроченная
+    запись удаляется, и ключ занимается заново.
+    """
+    try:
+        with transaction.atomic():
+            return True, IdempotencyRecord.objects.create(
+                user=user, key=key, fingerprint=fingerprint)
+    except IntegrityError:
+        pass
+    record = IdempotencyRecord.objects.filter(user=user, key=key).first()
+    if record is not None and record.created_at < expired_before():
+        IdempotencyRecord.objects.filter(
+            pk=record.pk, created_at=record.created_at).delete()
+        return claim(user, key, fingerprint)
+    return False, record
+
+
+def wait_for_result(record):
+    """Ожидание ответа параллельного запроса с тем же ключом.
+
+    Возвращает None, если первый запрос упал и освободил ключ.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while record.status_code is None and time.monotonic() < deadline:
+        time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+        record = IdempotencyRecord.objects.filter(pk=record.pk).first()
+        if record is None:
+            return None
+    return record
+
+
+def replay(record):
+    content = bytes(record.content)
+    response = HttpResponse(
+        zlib.decompress(content) if content else b'',
+        status=record.status_code,
+        content_type='application/json')
+    for name, value in record.headers:
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def save_response(record, response):
+    content = b''
+    if getattr(response, 'data', None) is not None:
+        content = zlib.compress(JSONRenderer().render(response.data))
+    IdempotencyRecord.objects.filter(pk=record.pk).update(
+        status_code=response.status_code,
+        headers=[
+            [name, value] for name, value in response.items()
+            if name.lower() not in SKIPPED_HEADERS],
+        content=content)
+
+
+def idempotent(method):
+    """Повтор POST с тем же Idempotency-Key возвращает сохранённый ответ.
+
+    Первый запрос занимает ключ строкой IdempotencyRecord, параллельные
+    дубли ждут его результата. Повтор не читает тело запроса дальше
+    хеша, не валидирует данные, не декодирует картинки и не пишет в БД.
+    Сохраняются только ответы, которые вернул сам метод, с кодом ниже
+    500. Исключение (ошибка валидации, 404) и ответ 5xx освобождают
+    ключ: с ним можно повторить исправленный запрос, и 4xx из
+    исключений не повторяются.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get('HTTP_IDEMPOTENCY_KEY')
+        if (not key or request.method != 'POST'
+                or not request.user.is_authenticated):
+            return method(self, request, *args, **kwargs)
+        if len(key) > settings.IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response(
+                {'errors': 'Слишком длинный Idempotency-Key.'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        claimed, record = claim(request.user, key, fingerprint)
+        if not claimed:
+            if record is not None and record.fingerprint != fingerprint:
+                return Response(
+                    {'errors': 'Ключ уже использован для другого запроса.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record is not None:
+                record = wait_for_result(record)
+            if record is None:
+                claimed, record = claim(request.user, key, fingerprint)
+            elif record.status_code is not None:
+                return replay(record)
+        if not claimed:
+            return Response(
+                {'errors': 'Запрос с этим ключом ещё выполняется.'},
+                status=status.HTTP_409_CONFLICT)
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+            return response
+        save_response(record, response)
+        return response
+    return wrapper
+
+
+@periodic(constants.PRUNE_INTERVAL)
+def prune_idempotency_records():
+    delete_older_than(
+        IdempotencyRecord.objects.all(), 'created_at', expired_before())
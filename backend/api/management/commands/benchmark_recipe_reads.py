@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_read import serialize_recipes
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает RecipeReadSerializer и быстрое чтение рецептов '
+            'на одной странице: время и число запросов к БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=40,
+            help='Число рецептов на странице.')
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Число повторов каждого варианта.')
+        parser.add_argument(
+            '--user', help='Email пользователя для флагов избранного.')
+
+    def handle(self, *args, **options):
+        user = AnonymousUser()
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError('Пользователь не найден.')
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        recipe_ids = list(Recipe.objects.values_list(
+            'pk', flat=True)[:options['limit']])
+        if not recipe_ids:
+            raise CommandError('В базе нет рецептов.')
+
+        def serializer():
+            return RecipeReadSerializer(
+                Recipe.objects.filter(pk__in=recipe_ids), many=True,
+                context={'request': request}).data
+
+        def fast():
+            return serialize_recipes(recipe_ids, request)
+
+        self.stdout.write(
+            f'Рецептов: {len(recipe_ids)}, повторов: {options["repeat"]}')
+        for name, read in (('Сериализатор', serializer),
+                           ('Быстрое чтение', fast)):
+            read()
+            timings = []
+            for _ in range(options['repeat']):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    read()
+                    timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name}: медиана {statistics.median(timings):.1f} мс, '
+                f'максимум {max(timings):.1f} мс, '
+                f'запросов {len(queries)}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
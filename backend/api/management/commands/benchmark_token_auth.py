@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.authentication import CachedTokenAuthentication, token_cache_key
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает проверку токена по БД и по кешу: '
+            'время и число запросов к БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=1000,
+            help='Число проверок каждого варианта.')
+        parser.add_argument(
+            '--user', help='Email пользователя, чей токен проверяется.')
+
+    def handle(self, *args, **options):
+        tokens = Token.objects.select_related('user')
+        if options['user']:
+            tokens = tokens.filter(user__email=options['user'])
+        token = tokens.first()
+        if token is None:
+            raise CommandError('Токен не найден.')
+        key = token.key
+
+        def cold():
+            cache.delete(token_cache_key(key))
+            return CachedTokenAuthentication().authenticate_credentials(key)
+
+        variants = (
+            ('БД', TokenAuthentication().authenticate_credentials),
+            ('Кеш, промах', lambda key: cold()),
+            ('Кеш', CachedTokenAuthentication().authenticate_credentials),
+        )
+        self.stdout.write(
+            f'Пользователь: {token.user.email}, '
+            f'повторов: {options["repeat"]}')
+        for name, authenticate in variants:
+            authenticate(key)
+            timings = []
+            for _ in range(options['repeat']):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    authenticate(key)
+                    timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name}: медиана {statistics.median(timings):.3f} мс, '
+                f'максимум {max(timings):.3f} мс, '
+                f'запросов {len(queries)}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
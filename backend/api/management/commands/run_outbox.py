@@ -0,0 +1,67 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from api.models import OutboxEvent
+from api.outbox import dispatch, get_stats, run_periodic
+
+
+class Command(BaseCommand):
+    help = ('Обрабатывает события outbox пачками: дубли схлопываются, '
+            'ошибки повторяются с задержкой.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться.')
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Показать размер очереди и отставание.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            stats = get_stats()
+            self.stdout.write(
+                f'В очереди: {stats["pending"]}, '
+                f'не обработано: {stats["dead"]}, '
+                f'без обработчика: {stats["skipped"]}, '
+                f'отставание: {stats["lag"]:.1f} с')
+            return
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        last_run = {}
+        while self.running:
+            close_old_connections()
+            self.run_periodic(last_run)
+            result = dispatch(
+                OutboxEvent.objects.all(), options['batch_size'])
+            if result['events']:
+                self.stdout.write(
+                    f'Событий: {result["events"]}, '
+                    f'обработано: {result["handled"]}, '
+                    f'схлопнуто: {result["coalesced"]}, '
+                    f'ошибок: {result["failed"]}, '
+                    f'без обработчика: {result["skipped"]}, '
+                    f'отставание: {result["lag"]:.2f} с')
+            elif options['once']:
+                break
+            else:
+                time.sleep(settings.OUTBOX_POLL_INTERVAL)
+        self.stdout.write(self.style.SUCCESS('Готово.'))
+
+    def run_periodic(self, last_run):
+        for name, error in run_periodic(last_run).items():
+            if error:
+                self.stderr.write(f'Задача {name} завершилась с ошибкой:')
+                self.stderr.write(error)
+            else:
+                self.stdout.write(f'Задача {name} выполнена.')
+
+    def stop(self, signum, frame):
+        self.running = False
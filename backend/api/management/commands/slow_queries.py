@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.db.models import Avg, Count, Max, Sum
+from django.utils import timezone
+
+from api.models import SlowQuery
+
+ORDERINGS = {
+    'total': 'total_ms',
+    'avg': 'avg_ms',
+    'max': 'max_ms',
+    'count': 'calls',
+}
+
+
+class Command(BaseCommand):
+    help = ('Топ медленных запросов по отпечатку SQL: число вызовов, '
+            'время, представления и последний план.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--hours', type=float, default=24,
+            help='Учитывать записи за последние часы.')
+        parser.add_argument(
+            '--order', choices=ORDERINGS, default='total')
+        parser.add_argument(
+            '--plans', action='store_true', help='Показать планы.')
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Удалить записи старше --hours и завершиться.')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        if options['prune']:
+            deleted, _ = SlowQuery.objects.filter(
+                created_at__lt=since).delete()
+            self.stdout.write(self.style.SUCCESS(f'Удалено: {deleted}.'))
+            return
+        samples = SlowQuery.objects.filter(created_at__gte=since)
+        top = list(samples.values('fingerprint').annotate(
+            calls=Count('id'),
+            total_ms=Sum('duration_ms'),
+            avg_ms=Avg('duration_ms'),
+            max_ms=Max('duration_ms'),
+        ).order_by(f'-{ORDERINGS[options["order"]]}')[:options['top']])
+        details = {}
+        for sample in samples.filter(
+                fingerprint__in=[row['fingerprint'] for row in top]):
+            # Записи идут от новых к старым.
+            detail = details.setdefault(sample.fingerprint, {
+                'sample': sample, 'views': set(), 'plan': ''})
+            detail['views'].add(sample.view)
+            detail['plan'] = detail['plan'] or sample.plan
+        for number, row in enumerate(top, 1):
+            detail = details[row['fingerprint']]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{number}. {row["fingerprint"]}: '
+                f'вызовов {row["calls"]}, всего {row["total_ms"]:.0f} мс, '
+                f'в среднем {row["avg_ms"]:.1f} мс, '
+                f'максимум {row["max_ms"]:.1f} мс'))
+            self.stdout.write(
+                f'Представления: {", ".join(sorted(detail["views"]))}')
+            for line in detail['sample'].origin:
+                self.stdout.write(f'  {line}')
+            self.stdout.write(detail['sample'].statement)
+            if options['plans']:
+                self.stdout.write(detail['plan'] or 'План ещё не снят.')
+            self.stdout.write('')
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management import BaseCommand
+from django.test import Client
+
+from api.warmup import warmup
+
+
+class Command(BaseCommand):
+    help = ('Прогревает структуры Django/DRF и кеш справочников, '
+            'затем измеряет задержку первого запроса.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-warmup', action='store_true',
+            help='Только замер холодного первого запроса.')
+        parser.add_argument(
+            '--probe', default='/api/recipes/',
+            help='Путь, на котором измеряется первый запрос.')
+
+    def handle(self, *args, **options):
+        if not options['no_warmup']:
+            timings = warmup()
+            for name, seconds in timings.items():
+                self.stdout.write(f'{name}: {seconds * 1000:.1f} мс')
+            self.stdout.write(
+                f'Прогрев: {sum(timings.values()) * 1000:.1f} мс')
+        client = Client(HTTP_ACCEPT='application/json')
+        for attempt in ('Первый', 'Второй'):
+            started = time.perf_counter()
+            response = client.get(options['probe'])
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(
+                f'{attempt} запрос {options["probe"]}: '
+                f'{response.status_code}, {elapsed:.1f} мс')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_outboxevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата')),
+                ('fingerprint', models.CharField(max_length=32, verbose_name='Отпечаток')),
+                ('statement', models.TextField(verbose_name='Нормализованный SQL')),
+                ('sql', models.TextField(verbose_name='SQL')),
+                ('view', models.CharField(max_length=255, verbose_name='Представление')),
+                ('origin', models.JSONField(default=list, verbose_name='Место вызова')),
+                ('duration_ms', models.FloatField(verbose_name='Время, мс')),
+                ('plan', models.TextField(blank=True, verbose_name='План')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='slowquery',
+            index=models.Index(fields=['fingerprint', 'created_at'], name='slowquery_fingerprint_idx'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('dead', 'Не обработано'), ('skipped', 'Нет обработчика')], default='pending', max_length=7, verbose_name='Статус'),
+        ),
+    ]
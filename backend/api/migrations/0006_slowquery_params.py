@@ -0,0 +1,29 @@
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+def delete_interpolated_queries(apps, schema_editor):
+    # Старые записи хранят SQL с подставленными значениями параметров.
+    apps.get_model('api', 'SlowQuery').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_outboxevent_skipped'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slowquery',
+            name='params',
+            field=models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Параметры без строк'),
+        ),
+        migrations.AlterField(
+            model_name='slowquery',
+            name='sql',
+            field=models.TextField(verbose_name='SQL с плейсхолдерами'),
+        ),
+        migrations.RunPython(
+            delete_interpolated_queries, migrations.RunPython.noop),
+    ]
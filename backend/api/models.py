@@ -0,0 +1,128 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from users.models import User
+
+
+class RequestProfile(models.Model):
+    """Профиль выполнения запроса: cProfile и SQL с таймингами."""
+    created_at = models.DateTimeField('Дата', auto_now_add=True)
+    method = models.CharField('Метод', max_length=10)
+    path = models.CharField('Путь', max_length=2000)
+    status_code = models.PositiveSmallIntegerField('Статус')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Пользователь')
+    duration_ms = models.FloatField('Время, мс')
+    query_count = models.PositiveIntegerField('Запросов к БД')
+    sql_time_ms = models.FloatField('Время SQL, мс')
+    summary = models.TextField('Сводка')
+    queries = models.JSONField('SQL-запросы', default=list)
+    stats = models.BinaryField('Данные pstats')
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} мс)'
+
+
+class SlowQuery(models.Model):
+    """Запрос к БД дольше SLOW_QUERY_THRESHOLD_MS и его план."""
+    created_at = models.DateTimeField(
+        'Дата', auto_now_add=True, db_index=True)
+    fingerprint = models.CharField('Отпечаток', max_length=32)
+    statement = models.TextField('Нормализованный SQL')
+    sql = models.TextField('SQL с плейсхолдерами')
+    params = models.JSONField(
+        'Параметры без строк', null=True, encoder=DjangoJSONEncoder)
+    view = models.CharField('Представление', max_length=255)
+    origin = models.JSONField('Место вызова', default=list)
+    duration_ms = models.FloatField('Время, мс')
+    plan = models.TextField('План', blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+        indexes = [
+            models.Index(
+                fields=['fingerprint', 'created_at'],
+                name='slowquery_fingerprint_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.view} ({self.duration_ms:.0f} мс)'
+
+
+class OutboxEvent(models.Model):
+    """Событие, записанное в одной транзакции с изменением данных.
+
+    Обрабатывается воркером run_outbox после коммита.
+    """
+    PENDING = 'pending'
+    DEAD = 'dead'
+    SKIPPED = 'skipped'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (DEAD, 'Не обработано'),
+        (SKIPPED, 'Нет обработчика'),
+    )
+    topic = models.CharField('Тип', max_length=64)
+    key = models.CharField('Ключ', max_length=255)
+    payload = models.JSONField('Данные', default=dict)
+    status = models.CharField(
+        'Статус', max_length=7, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    available_at = models.DateTimeField('Доступно с', auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Событие outbox'
+        verbose_name_plural = 'События outbox'
+        indexes = [
+            models.Index(
+                fields=['status', 'available_at'], name='outbox_ready_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.topic}:{self.key}'
+
+
+class IdempotencyRecord(models.Model):
+    """Ответ на POST с заголовком Idempotency-Key.
+
+    Пока status_code пуст, запрос с этим ключом ещё выполняется.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пользователь')
+    key = models.CharField('Ключ', max_length=255)
+    fingerprint = models.CharField('Отпечаток запроса', max_length=64)
+    status_code = models.PositiveSmallIntegerField(
+        'Статус', null=True, blank=True)
+    headers = models.JSONField('Заголовки', default=list)
+    content = models.BinaryField('Тело ответа', default=bytes)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}:{self.key}'
@@ -0,0 +1,167 @@
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from foodgram import constants
+from recipes.utils import delete_older_than
+from .models import OutboxEvent
+
+handlers = {}
+periodic_tasks = {}
+
+
+def handler(topic):
+    """Регистрирует обработчик событий topic: func(key, payload)."""
+    def decorator(func):
+        handlers[topic] = func
+        return func
+    return decorator
+
+
+def periodic(interval):
+    """Регистрирует задачу, которую run_outbox выполняет раз в interval
+    секунд: очистка журналов, подбор зависших заданий.
+    """
+    def decorator(func):
+        periodic_tasks[func] = interval
+        return func
+    return decorator
+
+
+def run_periodic(last_run):
+    """Выполняет задачи, для которых истёк интервал.
+
+    last_run хранит время прошлых запусков между вызовами. Упавшая
+    задача не мешает остальным и повторится через свой интервал.
+    Возвращает имена задач и ошибки.
+    """
+    now = time.monotonic()
+    results = {}
+    for func, interval in periodic_tasks.items():
+        if func in last_run and now - last_run[func] < interval:
+            continue
+        last_run[func] = now
+        try:
+            func()
+        except Exception:
+            results[func.__name__] = traceback.format_exc()
+        else:
+            results[func.__name__] = None
+    return results
+
+
+def publish(topic, key, payload=None):
+    """Записывает событие в текущей транзакции.
+
+    Событие пишется всегда: обработчик регистрируется в процессе
+    воркера, и в процессе, который публикует, его может не быть.
+    """
+    event = OutboxEvent.objects.create(
+        topic=topic, key=str(key), payload=payload or {})
+    if settings.OUTBOX_EAGER:
+        transaction.on_commit(
+            lambda: dispatch(OutboxEvent.objects.filter(pk=event.pk), 1))
+
+
+def publish_many(topic, keys, payload=None):
+    """События одной темы для многих ключей одной вставкой.
+
+    Для массовых операций вроде импорта, где publish на каждый
+    объект добавил бы по запросу.
+    """
+    keys = [str(key) for key in keys]
+    OutboxEvent.objects.bulk_create(
+        OutboxEvent(topic=topic, key=key, payload=payload or {})
+        for key in keys)
+    if settings.OUTBOX_EAGER and keys:
+        transaction.on_commit(lambda: dispatch(
+            OutboxEvent.objects.filter(topic=topic, key__in=keys),
+            len(keys)))
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_MAX_RETRY_DELAY))
+
+
+def dispatch(queryset, limit):
+    """Обрабатывает события, схлопывая дубли по (topic, key).
+
+    Обработчик вызывается один раз на группу с данными последнего
+    события. Его изменения и удаление событий фиксируются вместе;
+    упавшая группа откатывается к точке сохранения и откладывается
+    с экспоненциальной задержкой. События без обработчика переводятся
+    в SKIPPED, их можно вернуть в очередь из админки.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(queryset.select_for_update(skip_locked=True).filter(
+            status=OutboxEvent.PENDING, available_at__lte=now
+        ).order_by('pk')[:limit])
+        groups = {}
+        for event in events:
+            groups.setdefault((event.topic, event.key), []).append(event)
+        done, skipped, failed, unhandled = [], [], 0, 0
+        for (topic, key), group in groups.items():
+            if topic not in handlers:
+                unhandled += 1
+                skipped.extend(event.pk for event in group)
+                continue
+            try:
+                with transaction.atomic():
+                    handlers[topic](key, group[-1].payload)
+            except Exception:
+                failed += 1
+                attempts = max(event.attempts for event in group) + 1
+                dead = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+                OutboxEvent.objects.filter(
+                    pk__in=[event.pk for event in group]
+                ).update(
+                    attempts=attempts,
+                    error=traceback.format_exc(),
+                    available_at=now + retry_delay(attempts),
+                    status=OutboxEvent.DEAD if dead else OutboxEvent.PENDING)
+            else:
+                done.extend(event.pk for event in group)
+        OutboxEvent.objects.filter(pk__in=done).delete()
+        OutboxEvent.objects.filter(pk__in=skipped).update(
+            status=OutboxEvent.SKIPPED, error='Нет обработчика.')
+    lag = max(
+        ((now - event.created_at).total_seconds() for event in events),
+        default=0)
+    return {
+        'events': len(events),
+        'handled': len(groups) - failed - unhandled,
+        'coalesced': len(events) - len(groups),
+        'skipped': len(skipped),
+        'failed': failed,
+        'lag': lag,
+    }
+
+
+def get_stats():
+    """Размер очереди и возраст самого старого ожидающего события."""
+    pending = OutboxEvent.objects.filter(status=OutboxEvent.PENDING)
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'pending': pending.count(),
+        'dead': OutboxEvent.objects.filter(status=OutboxEvent.DEAD).count(),
+        'skipped': OutboxEvent.objects.filter(
+            status=OutboxEvent.SKIPPED).count(),
+        'lag': (timezone.now() - oldest).total_seconds() if oldest else 0,
+    }
+
+
+@periodic(constants.PRUNE_INTERVAL)
+def prune_skipped_events():
+    # Пропущенные события хранятся, пока их можно вернуть в очередь.
+    delete_older_than(
+        OutboxEvent.objects.filter(status=OutboxEvent.SKIPPED),
+        'created_at', timezone.now() - timedelta(
+            days=constants.OUTBOX_SKIPPED_RETENTION_DAYS))
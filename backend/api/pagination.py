@@ -1,5 +1,178 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from django.urls import reverse
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram import constants
+from .cache import get_count_version
+from .conditional import get_flags_version
+
+
+def get_limit_param(request, name, default, maximum, minimum=1):
+    """Значение числового параметра запроса в пределах [minimum, maximum]."""
+    try:
+        value = int(request.query_params.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(minimum, min(value, maximum))
+
+
+def estimate_count(queryset):
+    """Оценка планировщика PostgreSQL вместо COUNT(*).
+
+    Без фильтров берётся pg_class.reltuples, иначе — число строк
+    из плана EXPLAIN.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    query = queryset.query
+    if not query.where and not query.distinct and not query.combinator:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # До первого ANALYZE reltuples равен -1.
+        return int(row[0]) if row and row[0] >= 0 else None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class ApproximatePage(Page):
+    """Страница, для которой наличие следующей известно без COUNT."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CountingPaginator(Paginator):
+    """Paginator с кешированием количества и оценкой для больших выборок.
+
+    Точное количество кешируется на PAGINATION_COUNT_TIMEOUT по ключу
+    из SQL запроса и версий данных; версии сбрасываются при записи.
+    Если оценка планировщика больше PAGINATION_ESTIMATE_THRESHOLD,
+    COUNT(*) не выполняется, а количество помечается приближённым.
+    """
+
+    def __init__(self, object_list, per_page, scope=(), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.scope = scope
+        self.approximate = False
+
+    def get_cache_key(self):
+        queryset = self.object_list.order_by()
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(
+            f'{sql}:{params!r}'.encode()).hexdigest()
+        versions = ':'.join(str(part) for part in (
+            get_count_version(queryset.model), *self.scope))
+        return f'count:{versions}:{digest}'
+
+    @cached_property
+    def count(self):
+        # Срез (например, ограниченный поиск пользователей) нельзя
+        # переупорядочить для ключа и оценки, а COUNT по нему дёшев.
+        if (not isinstance(self.object_list, QuerySet)
+                or self.object_list.query.is_sliced):
+            return super().count
+        key = self.get_cache_key()
+        cached = cache.get(key)
+        if cached is None:
+            estimate = estimate_count(self.object_list)
+            if (estimate is not None
+                    and estimate > settings.PAGINATION_ESTIMATE_THRESHOLD):
+                cached = (estimate, True)
+            else:
+                cached = (self.object_list.count(), False)
+            cache.set(key, cached, settings.PAGINATION_COUNT_TIMEOUT)
+        count, self.approximate = cached
+        return count
+
+    def page(self, number):
+        if not (self.count and self.approximate):
+            return super().page(number)
+        # Номер страницы не сверяется с приближённым количеством:
+        # следующая страница определяется по лишней строке выборки.
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На этой странице нет результатов')
+        has_next = len(rows) > self.per_page
+        if has_next:
+            self.count = max(self.count, bottom + len(rows))
+        else:
+            # На последней странице количество известно точно.
+            self.count = bottom + len(rows)
+            self.approximate = False
+        return ApproximatePage(
+            rows[:self.per_page], number, self, has_next)
 
 
 class LimitPaginator(PageNumberPagination):
     page_size_query_param = 'limit'
+    max_page_size = constants.MAX_PAGE_SIZE
+    # Фильтры, с которыми выборка зависит от флагов пользователя.
+    flag_filters = ('is_favorited', 'is_in_shopping_cart')
+
+    def depends_on_flags(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+        return getattr(view, 'count_depends_on_flags', False) or any(
+            name in request.query_params for name in self.flag_filters)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Если количество зависит от избранного, корзины или подписок,
+        # версия флагов пользователя входит в ключ кеша. Остальные
+        # количества общие для всех пользователей.
+        self.count_scope = ()
+        if self.depends_on_flags(request, view):
+            self.count_scope = (get_flags_version(request.user),)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        return CountingPaginator(
+            queryset, page_size, scope=self.count_scope)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.page.paginator.approximate:
+            response.data['count_is_approximate'] = True
+            response.data.move_to_end('count_is_approximate', last=False)
+            response.data.move_to_end('count', last=False)
+        return response
+
+
+class BootstrapRecipesPaginator(LimitPaginator):
+    """Первая страница рецептов; ссылка ведёт на список рецептов."""
+
+    def get_page_number(self, request, paginator):
+        return 1
+
+    def get_next_link(self):
+        if not self.page.has_next():
+            return None
+        url = self.request.build_absolute_uri(reverse('api:recipes-list'))
+        if self.page_size_query_param in self.request.query_params:
+            url = replace_query_param(
+                url, self.page_size_query_param, self.page.paginator.per_page)
+        return replace_query_param(
+            url, self.page_query_param, self.page.next_page_number())
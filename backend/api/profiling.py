@@ -0,0 +1,263 @@
+import cProfile
+import hashlib
+import io
+import marshal
+import os
+import pstats
+import random
+import re
+import time
+import traceback
+from datetime import date, time as time_type, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from foodgram import constants
+from recipes.utils import delete_older_than
+from .authentication import CachedTokenAuthentication
+from .models import RequestProfile, SlowQuery
+from .outbox import handler, periodic, publish
+
+REDACTED = '<скрыто>'
+SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+SQL_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SQL_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """SQL без значений: запросы одной формы дают одну строку."""
+    sql = SQL_STRING.sub('?', sql.replace('%s', '?'))
+    sql = SQL_LIST.sub('(...)', SQL_NUMBER.sub('?', sql))
+    return SQL_SPACES.sub(' ', sql).strip()
+
+
+def redact_params(params):
+    """Параметры запроса без строк: в строках бывают email, токены,
+    тексты пользователей. Числа, даты и флаги остаются для EXPLAIN.
+    """
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: redact_value(value) for name, value in params.items()}
+    return [redact_value(value) for value in params]
+
+
+def redact_value(value):
+    if value is None or isinstance(
+            value, (bool, int, float, Decimal, date, time_type)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [redact_value(item) for item in value]
+    return REDACTED
+
+
+def unredact_params(params):
+    """Параметры для EXPLAIN: скрытые строки заменяются пустыми."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {
+            name: '' if value == REDACTED else value
+            for name, value in params.items()}
+    return ['' if value == REDACTED else value for value in params]
+
+
+class QueryRecorder:
+    """execute_wrapper, записывающий SQL, время и место вызова в коде."""
+
+    def __init__(self):
+        self.queries = []
+
+    def origin(self):
+        stack = traceback.StackSummary.extract(
+            traceback.walk_stack(None), lookup_lines=False)
+        frames = [
+            frame for frame in reversed(stack)
+            if frame.filename.startswith(settings.BASE_DIR)
+            and 'site-packages' not in frame.filename
+            and frame.filename != __file__
+        ]
+        return [
+            f'{os.path.relpath(frame.filename, settings.BASE_DIR)}:'
+            f'{frame.lineno} in {frame.name}'
+            for frame in frames[-settings.PROFILING_STACK_DEPTH:]
+        ]
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < settings.PROFILING_MAX_QUERIES:
+                self.queries.append({
+                    'sql': sql,
+                    'time_ms': (time.perf_counter() - started) * 1000,
+                    'origin': self.origin(),
+                })
+
+
+class ProfilingMiddleware:
+    """Профилирование запроса по заголовку X-Profile (только staff)
+    или по частоте PROFILING_SAMPLE_RATE.
+
+    Без заголовка и при нулевой частоте стоит одну проверку словаря.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        return self.profile(request)
+
+    def should_profile(self, request):
+        if request.META.get('HTTP_X_PROFILE'):
+            user = self.get_user(request)
+            return user is not None and user.is_staff
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    @staticmethod
+    def get_user(request):
+        """Пользователь из сессии или по токену; DRF ещё не отработал."""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user
+        try:
+            user, _ = (
+                CachedTokenAuthentication().authenticate(request)
+                or (None, None))
+        except AuthenticationFailed:
+            return None
+        return user
+
+    def profile(self, request):
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats(
+            'cumulative').print_stats(settings.PROFILING_SUMMARY_LINES)
+        profiler.create_stats()
+        profile = RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            status_code=response.status_code,
+            user=self.get_user(request),
+            duration_ms=duration_ms,
+            query_count=len(recorder.queries),
+            sql_time_ms=sum(query['time_ms'] for query in recorder.queries),
+            summary=summary.getvalue(),
+            queries=recorder.queries,
+            stats=marshal.dumps(profiler.stats),
+        )
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+
+class SlowQueryRecorder(QueryRecorder):
+    """execute_wrapper, записывающий только запросы дольше порога."""
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            # executemany нельзя повторить одним EXPLAIN.
+            if (not many
+                    and duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS
+                    and len(self.queries)
+                    < settings.SLOW_QUERY_MAX_PER_REQUEST):
+                statement = normalize_sql(sql)
+                self.queries.append({
+                    'fingerprint': hashlib.md5(
+                        statement.encode()).hexdigest(),
+                    'statement': statement,
+                    'sql': sql,
+                    'params': redact_params(params),
+                    'duration_ms': duration_ms,
+                    'origin': self.origin(),
+                })
+
+
+class SlowQueryMiddleware:
+    """Записывает запросы к БД дольше SLOW_QUERY_THRESHOLD_MS.
+
+    План снимает обработчик outbox уже после ответа, чтобы
+    EXPLAIN ANALYZE не выполнялся в запросе пользователя.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            return self.get_response(request)
+        recorder = SlowQueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        if recorder.queries:
+            self.save(request, recorder.queries)
+        return response
+
+    @staticmethod
+    def save(request, queries):
+        match = request.resolver_match
+        view = f'{request.method} {match.view_name if match else request.path}'
+        SlowQuery.objects.bulk_create(
+            SlowQuery(view=view[:255], **query) for query in queries)
+        for fingerprint in {query['fingerprint'] for query in queries}:
+            publish('slowquery.recorded', fingerprint)
+
+
+def explain(sql, params=None):
+    """План запроса; ANALYZE только для чтения без блокировок.
+
+    Вместо скрытых строк подставляются пустые, поэтому план снимается
+    для той же формы запроса, но не с исходными значениями.
+    """
+    upper = sql.lstrip().upper()
+    if connection.vendor != 'postgresql':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif upper.startswith('SELECT') and ' FOR UPDATE' not in upper:
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    else:
+        prefix = 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, unredact_params(params))
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+@handler('slowquery.recorded')
+def explain_slow_query(key, payload):
+    samples = SlowQuery.objects.filter(fingerprint=key)
+    fresh = timezone.now() - timedelta(
+        seconds=settings.SLOW_QUERY_EXPLAIN_INTERVAL)
+    if samples.filter(created_at__gte=fresh).exclude(plan='').exists():
+        return
+    sample = samples.filter(plan='').first()
+    if sample is not None:
+        sample.plan = explain(sample.sql, sample.params)
+        sample.save(update_fields=['plan'])
+
+
+@periodic(constants.PRUNE_INTERVAL)
+def prune_slow_queries():
+    delete_older_than(
+        SlowQuery.objects.all(), 'created_at', timezone.now() - timedelta(
+            days=constants.SLOW_QUERY_RETENTION_DAYS))
@@ -10,6 +10,9 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
 from foodgram import constants
+from .fields import SparseFieldsSerializerMixin
+from .outbox import publish
+from .pagination import get_limit_param
 from recipes.models import (
     Recipe, Ingredient, Tag, IngredientAmount,
     Favorite, ShoppingCart)
@@ -29,7 +32,7 @@ class UserSignUpSerializer(UserCreateSerializer):
         )
 
 
-class UserReadSerializer(UserSerializer):
+class UserReadSerializer(SparseFieldsSerializerMixin, UserSerializer):
     """Сериализатор для чтения пользователей."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -41,6 +44,8 @@ class UserReadSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return (self.context.get('request')
                 and self.context.get('request').user.is_authenticated
                 and Follow.objects.filter(
@@ -63,21 +68,20 @@ class FollowListSerializer(UserReadSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = None
+        recipes_limit = constants.MAX_RECIPES_LIMIT
         if request:
-            recipes_limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            try:
-                recipes = obj.recipes.all()[:int(recipes_limit)]
-            except ValueError:
-                pass
+            recipes_limit = get_limit_param(
+                request, 'recipes_limit', constants.MAX_RECIPES_LIMIT,
+                constants.MAX_RECIPES_LIMIT, minimum=0)
+        recipes = obj.recipes.all()[:recipes_limit]
         return RecipeShortSerializer(
             recipes, many=True,
             context={'request': request}
         ).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
 
@@ -245,6 +249,8 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self.create_ingredients(recipe, ingredients_data)
         recipe.tags.set(tags)
+        publish('recipe.created', recipe.pk)
+        publish('recipe.saved', recipe.pk)
         return recipe
 
     @transaction.atomic
@@ -261,6 +267,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         instance.tags.clear()
         instance.tags.set(tags)
         self.create_ingredients(instance, ingredients_data)
+        publish('recipe.saved', instance.pk)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
@@ -271,7 +278,8 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ).data
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(SparseFieldsSerializerMixin,
+                           serializers.ModelSerializer):
     """Сериализатор для чтения рецептов."""
     author = UserReadSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField()
@@ -0,0 +1,177 @@
+import bisect
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram import constants
+from .checks import PROCESS_LOCAL_CACHES
+
+# Списки и карточки каталога, без действий вроде /recipes/feed/.
+CATALOGUE_PATH = re.compile(r'/api/(recipes|tags|ingredients)/(\d+/)?')
+DOWNLOAD_PATH = '/api/recipes/download_shopping_cart/'
+
+
+def get_queue_time(request):
+    """Секунды от приёма запроса nginx до начала обработки.
+
+    nginx передаёт время приёма в X-Request-Start как t=<секунды>.
+    Без заголовка возвращается None.
+    """
+    value = request.META.get('HTTP_X_REQUEST_START', '')
+    try:
+        started = float(value.removeprefix('t='))
+    except ValueError:
+        return None
+    return max(0.0, time.time() - started)
+
+
+def get_endpoint(request):
+    """Класс эндпоинта, по которому выбирается бюджет ожидания.
+
+    Вызывается до разрешения URL, поэтому класс определяется по пути:
+    полный resolve() на каждый запрос повторил бы работу обработчика.
+    """
+    path = request.path_info
+    if path == DOWNLOAD_PATH:
+        return 'download'
+    if request.method not in SAFE_METHODS:
+        return 'write'
+    if CATALOGUE_PATH.fullmatch(path):
+        return 'catalogue'
+    return 'default'
+
+
+def is_cache_shared():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+class QueueTimeHistogram:
+    """Гистограммы времени в очереди по классам эндпоинтов.
+
+    Считаются в памяти процесса и не чаще QUEUE_TIME_FLUSH_INTERVAL
+    добавляются в общий кеш, чтобы экспорт видел все воркеры. Если кеш
+    у каждого процесса свой (LocMemCache), суммы остаются в процессе и
+    экспортируются с меткой pid: без неё Prometheus принял бы счётчики
+    разных воркеров за один сбрасывающийся счётчик.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.totals = {}
+        self.flushed_at = time.monotonic()
+
+    def observe(self, endpoint, seconds, shed):
+        index = bisect.bisect_left(constants.QUEUE_TIME_BUCKETS, seconds)
+        with self.lock:
+            counts = self.pending.setdefault(endpoint, {})
+            for name, delta in (
+                    (index, 1), ('sum_ms', round(seconds * 1000)),
+                    ('shed', int(shed))):
+                counts[name] = counts.get(name, 0) + delta
+            due = (time.monotonic() - self.flushed_at
+                   >= settings.QUEUE_TIME_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def flush(self):
+        shared = is_cache_shared()
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+            if not shared:
+                for endpoint, counts in pending.items():
+                    for name, delta in counts.items():
+                        key = f'queue_time:{endpoint}:{name}'
+                        self.totals[key] = self.totals.get(key, 0) + delta
+                return
+        for endpoint, counts in pending.items():
+            for name, delta in counts.items():
+                if delta:
+                    self.add(f'queue_time:{endpoint}:{name}', delta)
+
+    @staticmethod
+    def add(key, delta):
+        # incr атомарен в общих бэкендах; add создаёт ключ без срока.
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            if not cache.add(key, delta, None):
+                cache.incr(key, delta)
+
+    def export(self):
+        """Гистограммы в текстовом формате Prometheus."""
+        self.flush()
+        buckets = constants.QUEUE_TIME_BUCKETS
+        lines = [
+            '# HELP foodgram_queue_time_seconds '
+            'Время от приёма запроса nginx до начала обработки.',
+            '# TYPE foodgram_queue_time_seconds histogram',
+        ]
+        shed = [
+            '# HELP foodgram_shed_requests_total '
+            'Запросы, отклонённые с 503 из-за долгого ожидания.',
+            '# TYPE foodgram_shed_requests_total counter',
+        ]
+        shared = is_cache_shared()
+        for endpoint in settings.LOAD_SHEDDING_BUDGETS:
+            keys = [f'queue_time:{endpoint}:{name}' for name in (
+                *range(len(buckets) + 1), 'sum_ms', 'shed')]
+            values = cache.get_many(keys) if shared else self.totals
+            counts = [values.get(key, 0) for key in keys]
+            label = f'endpoint="{endpoint}"'
+            if not shared:
+                label += f',pid="{os.getpid()}"'
+            total = 0
+            for bound, count in zip((*buckets, '+Inf'), counts):
+                total += count
+                lines.append(
+                    f'foodgram_queue_time_seconds_bucket'
+                    f'{{{label},le="{bound}"}} {total}')
+            lines.append(
+                f'foodgram_queue_time_seconds_sum{{{label}}} '
+                f'{counts[-2] / 1000}')
+            lines.append(
+                f'foodgram_queue_time_seconds_count{{{label}}} {total}')
+            shed.append(
+                f'foodgram_shed_requests_total{{{label}}} {counts[-1]}')
+        return '\n'.join(lines + shed) + '\n'
+
+
+histogram = QueueTimeHistogram()
+
+
+class LoadSheddingMiddleware:
+    """Отклоняет запросы, слишком долго ждавшие свободного воркера.
+
+    Клиент такого запроса, скорее всего, уже не ждёт ответа, поэтому
+    вместо обработки сразу возвращается 503 с Retry-After. Бюджеты
+    LOAD_SHEDDING_BUDGETS строже для тяжёлых и пишущих запросов,
+    чем для каталога, который отдаётся из кеша. Проверка идёт до
+    остальных middleware: отказ не загружает сессию и пользователя
+    и не попадает в профилирование.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queue_time = get_queue_time(request)
+        if queue_time is None:
+            return self.get_response(request)
+        endpoint = get_endpoint(request)
+        shed = queue_time > settings.LOAD_SHEDDING_BUDGETS[endpoint]
+        histogram.observe(endpoint, queue_time, shed)
+        if not shed:
+            return self.get_response(request)
+        response = JsonResponse(
+            {'detail': 'Сервер перегружен, повторите запрос позже.'},
+            status=503, json_dumps_params={'ensure_ascii': False})
+        response['Retry-After'] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+        return response
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import CachedTokenAuthentication, token_cache_key
+from .utils import create_user
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Токен проверяется по кешу и сбрасывается вместе с пользователем."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(
+            self.token.key)
+
+    def test_warm_cache_without_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertTrue(user.is_authenticated)
+        self.assertTrue(user.is_active)
+        self.assertEqual(token.key, self.token.key)
+        self.assertIs(token.user, user)
+
+    def test_cache_holds_only_user_id(self):
+        self.authenticate()
+        self.assertEqual(
+            cache.get(token_cache_key(self.token.key)), self.user.pk)
+
+    def test_user_fields_are_loaded_lazily(self):
+        self.authenticate()
+        user, _ = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+            self.assertEqual(user.username, self.user.username)
+            self.assertFalse(user.is_staff)
+
+    def test_request_user(self):
+        for _ in range(2):
+            response = self.client.get('/api/users/me/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['email'], self.user.email)
+
+    def assert_rejected(self):
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout(self):
+        self.client.get('/api/users/me/')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_rejected()
+
+    def test_token_deleted(self):
+        self.client.get('/api/users/me/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(user=self.user).delete()
+        self.assert_rejected()
+
+    def test_user_deactivated(self):
+        self.client.get('/api/users/me/')
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assert_rejected()
+
+    def test_last_login_keeps_cache(self):
+        self.authenticate()
+        self.user.save(update_fields=['last_login'])
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.documents import rebuild_documents
+from recipes.models import (
+    Favorite, IngredientAmount, Recipe, ShoppingCart)
+from users.models import Follow
+from .utils import add_flags, create_catalogue, create_user
+
+URL = '/api/bootstrap/'
+
+
+class BootstrapViewTest(TestCase):
+    """Стартовые данные SPA за фиксированное число запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, cls.ingredients, cls.authors, cls.recipes = (
+            create_catalogue())
+        cls.user = create_user('reader')
+        add_flags(cls.user, cls.recipes, cls.authors)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def grow(self, count):
+        """Новые рецепты с тегами и ингредиентами, все во флагах читателя."""
+        authors = [
+            create_user(f'new{len(self.authors) + index}')
+            for index in range(count)]
+        recipes = []
+        for index, author in enumerate(authors):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Новый рецепт {index}', text='Текст',
+                cooking_time=10)
+            recipe.tags.set(self.tags)
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(recipe=recipe, ingredient=ingredient,
+                                 amount=index + 1)
+                for ingredient in self.ingredients)
+            recipes.append(recipe)
+        rebuild_documents([recipe.pk for recipe in recipes])
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=self.user, recipe=recipe) for recipe in recipes)
+        Follow.objects.bulk_create(
+            Follow(user=self.user, author=author) for author in authors)
+
+    def count_queries(self, client):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_constant_queries(self):
+        clients = (self.client, APIClient())
+        counts = [self.count_queries(client)[0] for client in clients]
+        self.grow(10)
+        self.assertEqual(
+            [self.count_queries(client)[0] for client in clients], counts)
+
+    def test_content(self):
+        self.grow(2)
+        _, data = self.count_queries(self.client)
+        self.assertEqual(data['user']['id'], self.user.pk)
+        self.assertEqual(data['favorites'], sorted(Favorite.objects.filter(
+            user=self.user).values_list('recipe_id', flat=True)))
+        self.assertEqual(
+            data['shopping_cart'], sorted(ShoppingCart.objects.filter(
+                user=self.user).values_list('recipe_id', flat=True)))
+        self.assertEqual(data['subscriptions'], sorted(Follow.objects.filter(
+            user=self.user).values_list('author_id', flat=True)))
+        self.assertEqual(
+            [tag['slug'] for tag in data['tags']],
+            [tag.slug for tag in self.tags])
+        self.assertEqual(data['recipes']['count'], Recipe.objects.count())
+        favorites = set(data['favorites'])
+        for recipe in data['recipes']['results']:
+            self.assertEqual(
+                recipe['is_favorited'], recipe['id'] in favorites)
+
+    def test_anonymous(self):
+        _, data = self.count_queries(APIClient())
+        self.assertIsNone(data['user'])
+        self.assertEqual(
+            (data['favorites'], data['shopping_cart'],
+             data['subscriptions']),
+            ([], [], []))
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from foodgram import constants
+from recipes.events import prune_recipe_changes
+from recipes.models import Recipe, RecipeChange
+from .utils import add_flags, create_catalogue, create_user
+
+URL = '/api/recipes/changes/'
+
+
+class RecipeChangesTest(TestCase):
+    """Синхронизация по журналу изменений рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, _, cls.authors, cls.recipes = create_catalogue()
+        cls.reader = create_user('reader')
+        add_flags(cls.reader, cls.recipes, cls.authors)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.settle(RecipeChange.objects.all())
+
+    def settle(self, changes):
+        changes.update(changed_at=timezone.now() - timedelta(
+            seconds=constants.CHANGES_SETTLE_SECONDS + 1))
+
+    def last_change_id(self):
+        return RecipeChange.objects.latest('id').pk
+
+    def test_updated_match_detail(self):
+        response = self.client.get(URL, {'since': 0})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data['reset'])
+        self.assertEqual(data['cursor'], self.last_change_id())
+        self.assertEqual(
+            {recipe['id'] for recipe in data['updated']},
+            {recipe.pk for recipe in self.recipes})
+        for recipe in data['updated']:
+            with self.subTest(recipe=recipe['id']):
+                self.assertEqual(
+                    recipe,
+                    self.client.get(f'/api/recipes/{recipe["id"]}/').json())
+
+    def test_queries_do_not_depend_on_page(self):
+        since = RecipeChange.objects.filter(
+            recipe_id=self.recipes[-1].pk).order_by('id').first().pk - 1
+        with CaptureQueriesContext(connection) as few:
+            data = self.client.get(URL, {'since': since}).json()
+        self.assertEqual(len(data['updated']), 1)
+        with CaptureQueriesContext(connection) as many:
+            data = self.client.get(URL, {'since': 0}).json()
+        self.assertEqual(len(data['updated']), len(self.recipes))
+        self.assertEqual(len(many), len(few))
+
+    def test_deleted(self):
+        recipe_id = self.recipes[0].pk
+        self.recipes[0].delete()
+        since = self.last_change_id() - 1
+        self.settle(RecipeChange.objects.all())
+        data = self.client.get(URL, {'since': since}).json()
+        self.assertEqual(data['deleted'], [recipe_id])
+        self.assertEqual(data['updated'], [])
+
+    def test_cursor_waits_for_unsettled_changes(self):
+        settled = self.last_change_id()
+        recipe = self.recipes[1]
+        recipe.name = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        data = self.client.get(URL, {'since': settled - 1}).json()
+        self.assertEqual(data['cursor'], settled)
+        self.assertIn(recipe.pk, [item['id'] for item in data['updated']])
+        # Свежая запись приходит повторно, пока не устоится.
+        data = self.client.get(URL, {'since': data['cursor']}).json()
+        self.assertEqual(data['cursor'], settled)
+        self.assertEqual(
+            [item['name'] for item in data['updated']], ['Новое название'])
+        self.settle(RecipeChange.objects.all())
+        data = self.client.get(URL, {'since': data['cursor']}).json()
+        self.assertEqual(data['cursor'], self.last_change_id())
+
+    def test_has_more(self):
+        with mock.patch.object(constants, 'CHANGES_PAGE_SIZE', 2):
+            data = self.client.get(URL, {'since': 0}).json()
+        self.assertTrue(data['has_more'])
+        self.assertEqual(
+            data['cursor'], RecipeChange.objects.order_by('id')[1].pk)
+
+    def test_reset_for_pruned_cursor(self):
+        changes = RecipeChange.objects.order_by('id')
+        pruned = changes[1].pk
+        RecipeChange.objects.filter(pk__lte=pruned).delete()
+        data = self.client.get(URL, {'since': pruned - 1}).json()
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['cursor'], self.last_change_id())
+        self.assertEqual(data['updated'], [])
+        # Курсор сразу за удалённой частью ещё действителен.
+        data = self.client.get(URL, {'since': pruned}).json()
+        self.assertFalse(data['reset'])
+
+    def test_prune_keeps_latest(self):
+        RecipeChange.objects.update(changed_at=timezone.now() - timedelta(
+            days=constants.CHANGES_RETENTION_DAYS + 1))
+        latest = self.last_change_id()
+        prune_recipe_changes()
+        self.assertEqual(
+            list(RecipeChange.objects.values_list('id', flat=True)),
+            [latest])
+        data = self.client.get(URL, {'since': 0}).json()
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['cursor'], latest)
+        self.assertTrue(Recipe.objects.exists())
+
+    def test_invalid_since(self):
+        response = self.client.get(URL, {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
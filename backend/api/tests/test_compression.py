@@ -0,0 +1,102 @@
+import gzip
+
+import brotli
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient
+from .utils import create_catalogue
+
+
+class CompressionTest(TestCase):
+    """Сжатие ответов API и выбор кодировки по Accept-Encoding."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalogue()
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {index}', measurement_unit='г')
+            for index in range(100))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, url, encoding=None, **headers):
+        if encoding is not None:
+            headers['HTTP_ACCEPT_ENCODING'] = encoding
+        return self.client.get(url, **headers)
+
+    def assert_vary(self, response):
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_negotiation(self):
+        plain = self.get('/api/recipes/').content
+        for header, expected in (
+            ('gzip', 'gzip'),
+            ('gzip, br', 'br'),
+            ('br;q=0.5, gzip', 'gzip'),
+            ('br;q=0, *;q=0.1', 'gzip'),
+            ('*', 'br'),
+        ):
+            with self.subTest(header=header):
+                response = self.get('/api/recipes/', header)
+                self.assertEqual(response['Content-Encoding'], expected)
+                self.assertEqual(
+                    response['Content-Length'], str(len(response.content)))
+                self.assert_vary(response)
+                decompress = (
+                    gzip.decompress if expected == 'gzip'
+                    else brotli.decompress)
+                self.assertEqual(decompress(response.content), plain)
+
+    def test_identity(self):
+        for header in (None, 'identity', 'gzip;q=0, br;q=0'):
+            with self.subTest(header=header):
+                response = self.get('/api/recipes/', header)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assert_vary(response)
+
+    def test_small_response_not_compressed(self):
+        response = self.get('/api/tags/1/', 'gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_weak_etag(self):
+        response = self.get('/api/recipes/', 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        strong = self.get('/api/recipes/')['ETag']
+        self.assertEqual(response['ETag'], f'W/{strong}')
+        # Слабый ETag сравнивается со строгим при If-None-Match.
+        response = self.get(
+            '/api/recipes/', 'gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_html_not_compressed(self):
+        for url, headers in (
+            ('/api/recipes/', {'HTTP_ACCEPT': 'text/html'}),
+            ('/admin/login/', {}),
+        ):
+            with self.subTest(url=url):
+                response = self.get(url, 'gzip, br', **headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['Content-Type'].startswith(
+                    'text/html'))
+                self.assertGreater(len(response.content), 1024)
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_catalogue_variants(self):
+        plain = self.get('/api/ingredients/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assert_vary(plain)
+        for header, decompress in (
+            ('gzip', gzip.decompress), ('br', brotli.decompress),
+        ):
+            with self.subTest(header=header):
+                with self.assertNumQueries(0):
+                    response = self.get('/api/ingredients/', header)
+                self.assertEqual(response['Content-Encoding'], header)
+                self.assert_vary(response)
+                self.assertEqual(
+                    decompress(response.content), plain.content)
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, RecipeChange
+from .utils import create_catalogue, create_user
+
+
+class ConditionalRecipeTest(TestCase):
+    """Условные запросы к списку и детальной странице рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _, _, cls.authors, cls.recipes = create_catalogue(recipes=4)
+        cls.reader = create_user('reader')
+
+    def setUp(self):
+        cache.clear()
+        # Last-Modified округляется до секунды: данные каталога отодвинуты
+        # в прошлое, чтобы изменение в тесте было заметно.
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Recipe.objects.update(updated_at=hour_ago)
+        RecipeChange.objects.update(changed_at=hour_ago)
+        self.client = APIClient()
+        self.detail = f'/api/recipes/{self.recipes[1].pk}/'
+
+    def test_detail_not_modified(self):
+        response = self.client.get(self.detail)
+        self.assertEqual(response.status_code, 200)
+        for header, value in (
+            ('HTTP_IF_NONE_MATCH', response['ETag']),
+            ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified']),
+        ):
+            with self.subTest(header=header):
+                repeated = self.client.get(self.detail, **{header: value})
+                self.assertEqual(repeated.status_code, 304)
+                self.assertEqual(repeated['ETag'], response['ETag'])
+
+    def test_detail_modified_by_update(self):
+        response = self.client.get(self.detail)
+        Recipe.objects.filter(pk=self.recipes[1].pk).update(
+            updated_at=timezone.now())
+        for header, value in (
+            ('HTTP_IF_NONE_MATCH', response['ETag']),
+            ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified']),
+        ):
+            with self.subTest(header=header):
+                repeated = self.client.get(self.detail, **{header: value})
+                self.assertEqual(repeated.status_code, 200)
+
+    def test_flags_change_etag(self):
+        self.client.force_authenticate(self.reader)
+        etags = {
+            url: self.client.get(url)['ETag']
+            for url in (self.detail, '/api/recipes/')
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{self.detail}favorite/')
+        self.assertEqual(response.status_code, 201)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_flags_are_per_user(self):
+        other = APIClient()
+        other.force_authenticate(create_user('other'))
+        etag = other.get(self.detail)['ETag']
+        self.client.force_authenticate(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{self.detail}favorite/')
+        response = other.get(self.detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_modified_since_deletion(self):
+        response = self.client.get('/api/recipes/')
+        last_modified = response['Last-Modified']
+        self.assertEqual(
+            self.client.get(
+                '/api/recipes/', HTTP_IF_MODIFIED_SINCE=last_modified
+            ).status_code, 304)
+        # Удаляется не самый свежий рецепт: Max(updated_at) не меняется.
+        author = APIClient()
+        author.force_authenticate(self.recipes[1].author)
+        self.assertEqual(author.delete(self.detail).status_code, 204)
+        response = self.client.get(
+            '/api/recipes/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(
+            self.recipes[1].pk,
+            [recipe['id'] for recipe in response.json()['results']])
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import models
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.cache import get_count_version
+from api.conditional import get_flags_version
+from foodgram import constants
+from recipes.deletion import (
+    delete_user_account, reverse_relations, run_pending_jobs)
+from recipes.events import run_deletion_jobs
+from recipes.models import DeletionJob, Recipe, RecipeChange
+from users.models import Follow, User
+from .utils import add_flags, create_catalogue, create_user
+
+
+@override_settings(OUTBOX_EAGER=False)
+class DeletionTest(TestCase):
+    """Удаление рецептов и аккаунтов не оставляет зависимых строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _, _, cls.authors, cls.recipes = create_catalogue()
+        cls.author = cls.authors[0]
+        cls.reader = create_user('reader')
+        add_flags(cls.reader, cls.recipes, cls.authors)
+        Follow.objects.create(user=cls.author, author=cls.authors[1])
+        cls.token = Token.objects.create(user=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_no_orphans(self, model, pks):
+        for relation in reverse_relations(model):
+            if relation.on_delete is not models.CASCADE:
+                continue
+            related = relation.related_model._base_manager.filter(
+                **{f'{relation.field.name}__in': pks})
+            with self.subTest(model=model, related=related.model):
+                self.assertFalse(related.exists())
+
+    def versions(self):
+        return (
+            get_flags_version(self.reader),
+            get_count_version(Recipe),
+            get_count_version(User),
+        )
+
+    def assert_token_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(client.get('/api/users/me/').status_code, 401)
+
+    def test_delete_recipe(self):
+        recipe = self.recipes[0]
+        flags, recipes_count, _ = self.versions()
+        client = APIClient()
+        client.force_authenticate(recipe.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.delete(f'/api/recipes/{recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_no_orphans(Recipe, [recipe.pk])
+        self.assertTrue(RecipeChange.objects.filter(
+            recipe_id=recipe.pk, action=RecipeChange.DELETED).exists())
+        self.assertNotEqual(get_flags_version(self.reader), flags)
+        self.assertNotEqual(get_count_version(Recipe), recipes_count)
+
+    def test_delete_account(self):
+        recipe_ids = [
+            recipe.pk for recipe in self.recipes
+            if recipe.author_id == self.author.pk]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(client.get('/api/users/me/').status_code, 200)
+        before = self.versions()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(delete_user_account(self.author))
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assert_no_orphans(User, [self.author.pk])
+        self.assert_no_orphans(Recipe, recipe_ids)
+        self.assertFalse(Recipe.objects.filter(pk__in=recipe_ids).exists())
+        # Токен, флаги подписчика и оба количества сброшены.
+        self.assert_token_rejected()
+        for old, new in zip(before, self.versions()):
+            self.assertNotEqual(old, new)
+
+    @mock.patch.object(constants, 'BULK_DELETE_ASYNC_THRESHOLD', 1)
+    def test_large_account_deleted_by_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = delete_user_account(self.author)
+        self.assertEqual(job.status, DeletionJob.PENDING)
+        self.assertEqual(job.total_recipes, 4)
+        self.assertFalse(User.objects.get(pk=self.author.pk).is_active)
+        self.assert_token_rejected()
+        with self.captureOnCommitCallbacks(execute=True):
+            run_deletion_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        self.assertEqual(job.deleted_recipes, 4)
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assert_no_orphans(User, [self.author.pk])
+        self.assertEqual(run_pending_jobs(), [])
+
+    @override_settings(OUTBOX_EAGER=True)
+    @mock.patch.object(constants, 'BULK_DELETE_ASYNC_THRESHOLD', 1)
+    def test_eager_job_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = delete_user_account(self.author)
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+
+    def test_stale_jobs_resumed(self):
+        fresh, stale = (
+            DeletionJob.objects.create(
+                user_id=user.pk, status=DeletionJob.RUNNING)
+            for user in self.authors[1:])
+        DeletionJob.objects.filter(pk=stale.pk).update(
+            updated_at=timezone.now() - timedelta(
+                seconds=constants.DELETION_JOB_STALE_SECONDS + 1))
+        self.assertEqual(run_pending_jobs(), [stale.pk])
+        self.assertTrue(User.objects.filter(pk=fresh.user_id).exists())
+        self.assertFalse(User.objects.filter(pk=stale.user_id).exists())
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+
+from api.fast_read import build_documents
+from recipes.documents import pending
+from recipes.models import RecipeDocument
+from .utils import create_catalogue
+
+
+class RecipeDocumentRebuildTest(TestCase):
+    """Документы рецептов пересобираются один раз после коммита."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, _, _, cls.recipes = create_catalogue(recipes=4)
+
+    def setUp(self):
+        pending.recipe_ids = set()
+
+    def edit(self, recipe, name):
+        recipe.name = name
+        recipe.save()
+        recipe.tags.set(self.tags)
+
+    def test_one_rebuild_per_transaction(self):
+        first, second = self.recipes[1], self.recipes[2]
+        with mock.patch('recipes.documents.rebuild_documents') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    self.edit(first, 'Первый')
+                    self.edit(second, 'Второй')
+        self.assertGreater(len(callbacks), 1)
+        rebuild.assert_called_once_with(sorted([first.pk, second.pk]))
+
+    def test_document_rebuilt_after_commit(self):
+        recipe = self.recipes[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.edit(recipe, 'Новое название')
+        document = RecipeDocument.objects.get(recipe=recipe).document
+        self.assertEqual(document, build_documents([recipe.pk])[recipe.pk])
+        self.assertEqual(document['name'], 'Новое название')
+
+    def test_rollback_keeps_document(self):
+        recipe = self.recipes[1]
+        document = RecipeDocument.objects.get(recipe=recipe).document
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    self.edit(recipe, 'Откатится')
+                    raise ValueError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(
+            RecipeDocument.objects.get(recipe=recipe).document, document)
+        # Следующий коммит пересобирает и id из откатившейся транзакции.
+        with mock.patch('recipes.documents.rebuild_documents') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.recipes[2].save()
+        rebuild.assert_called_once_with(
+            sorted([recipe.pk, self.recipes[2].pk]))
@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .utils import add_flags, create_catalogue, create_user
+
+LIST_URL = '/api/recipes/'
+QUERIES = (
+    '',
+    '?limit=5&page=2',
+    '?tags=lunch&tags=dinner',
+    '?tags=lunch&tags=dinner&tags_mode=all',
+    '?is_favorited=1',
+    '?is_in_shopping_cart=1&tags=breakfast',
+    '?fields=id,name,is_favorited',
+    '?omit=author,ingredients',
+    '?fields=author,tags&is_favorited=1',
+)
+
+
+class FastReadParityTest(TestCase):
+    """Быстрое чтение отдаёт те же байты, что RecipeReadSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients, cls.authors, cls.recipes = create_catalogue()
+        cls.user = create_user('reader')
+        add_flags(cls.user, cls.recipes, cls.authors)
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_both(self, client, url):
+        responses = []
+        for fast_read in (False, True):
+            with override_settings(RECIPE_FAST_READ=fast_read):
+                cache.clear()
+                responses.append(client.get(url))
+        return responses
+
+    def assert_same(self, client, url):
+        serializer, fast = self.get_both(client, url)
+        self.assertEqual(serializer.status_code, fast.status_code, url)
+        self.assertEqual(serializer.content, fast.content, url)
+        return fast
+
+    def test_list(self):
+        for documents in (False, True):
+            for client in (self.anonymous, self.client):
+                for query in QUERIES:
+                    with self.subTest(documents=documents, query=query), \
+                            override_settings(RECIPE_DOCUMENTS=documents):
+                        response = self.assert_same(
+                            client, LIST_URL + query)
+                        self.assertEqual(response.status_code, 200)
+
+    def test_detail(self):
+        for documents in (False, True):
+            for client in (self.anonymous, self.client):
+                for recipe in self.recipes[:4]:
+                    for query in ('', '?fields=id,image,is_in_shopping_cart'):
+                        url = f'{LIST_URL}{recipe.pk}/{query}'
+                        with self.subTest(documents=documents, url=url), \
+                                override_settings(
+                                    RECIPE_DOCUMENTS=documents):
+                            self.assert_same(client, url)
+
+    def test_flags_are_rendered(self):
+        response = self.assert_same(
+            self.client, LIST_URL + '?limit=100')
+        results = {item['id']: item for item in response.json()['results']}
+        favorited = {recipe.pk for recipe in self.recipes[::2]}
+        self.assertEqual(
+            {pk for pk, item in results.items() if item['is_favorited']},
+            favorited)
+        self.assertTrue(any(
+            item['author']['is_subscribed'] for item in results.values()))
+
+    def test_missing_recipe(self):
+        self.assert_same(self.client, f'{LIST_URL}0/')
+        self.assert_same(self.client, f'{LIST_URL}abc/')
+
+    def test_unknown_field(self):
+        self.assert_same(self.client, LIST_URL + '?fields=id,secret')
@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.outbox import dispatch, publish
+from foodgram import constants
+from recipes.feed import refresh_pull_authors
+from api.models import OutboxEvent
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+from .utils import create_catalogue, create_user
+
+URL = '/api/recipes/feed/'
+
+
+class FeedTest(TestCase):
+    """Лента подписок: раскладка по лентам и чтение на лету."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _, _, cls.authors, cls.recipes = create_catalogue()
+        cls.reader = create_user('reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def subscribe(self, author, run_outbox=True):
+        response = self.client.post(f'/api/users/{author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        if run_outbox:
+            dispatch(OutboxEvent.objects.all(), 100)
+
+    def feed_ids(self, **params):
+        response = self.client.get(URL, {'limit': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def expected_ids(self, *authors):
+        return list(Recipe.objects.filter(author__in=authors).order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True))
+
+    def test_backfill_after_follow(self):
+        self.assertEqual(self.feed_ids(), [])
+        self.subscribe(self.authors[0])
+        self.assertEqual(
+            self.feed_ids(), self.expected_ids(self.authors[0]))
+        self.subscribe(self.authors[1])
+        self.assertEqual(
+            self.feed_ids(),
+            self.expected_ids(self.authors[0], self.authors[1]))
+
+    def test_fan_out_new_recipe(self):
+        self.subscribe(self.authors[0])
+        recipe = Recipe.objects.create(
+            author=self.authors[0], name='Новый', text='Текст',
+            cooking_time=10)
+        publish('recipe.created', recipe.pk)
+        dispatch(OutboxEvent.objects.all(), 100)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, recipe=recipe).exists())
+        self.assertEqual(self.feed_ids()[0], recipe.pk)
+
+    def test_unfollow_prunes_feed(self):
+        self.subscribe(self.authors[0])
+        self.subscribe(self.authors[1])
+        response = self.client.delete(
+            f'/api/users/{self.authors[0].pk}/subscribe/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(FeedEntry.objects.filter(
+            user=self.reader, author=self.authors[0]).exists())
+        self.assertEqual(
+            self.feed_ids(), self.expected_ids(self.authors[1]))
+
+    def test_follow_cancelled_before_dispatch(self):
+        self.client.post(f'/api/users/{self.authors[0].pk}/subscribe/')
+        Follow.objects.filter(user=self.reader).delete()
+        dispatch(OutboxEvent.objects.all(), 100)
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    def test_pull_authors(self):
+        self.subscribe(self.authors[0])
+        self.subscribe(self.authors[1], run_outbox=False)
+        other = create_user('other')
+        Follow.objects.create(user=other, author=self.authors[1])
+        with mock.patch.object(constants, 'FEED_FANOUT_MAX_FOLLOWERS', 1):
+            refresh_pull_authors()
+        dispatch(OutboxEvent.objects.all(), 100)
+        # Для автора, читаемого на лету, записей не появляется.
+        self.assertFalse(FeedEntry.objects.filter(
+            user=self.reader, author=self.authors[1]).exists())
+        recipe = Recipe.objects.create(
+            author=self.authors[1], name='Новый', text='Текст',
+            cooking_time=10)
+        publish('recipe.created', recipe.pk)
+        dispatch(OutboxEvent.objects.all(), 100)
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        self.assertEqual(self.feed_ids()[0], recipe.pk)
+        self.assertEqual(
+            self.feed_ids(),
+            self.expected_ids(self.authors[0], self.authors[1]))
+        self.assertEqual(
+            self.feed_ids(limit=3, page=2),
+            self.expected_ids(self.authors[0], self.authors[1])[3:6])
+
+    def test_matches_detail(self):
+        self.subscribe(self.authors[0])
+        results = self.client.get(URL).json()['results']
+        for recipe in results:
+            with self.subTest(recipe=recipe['id']):
+                self.assertEqual(
+                    recipe,
+                    self.client.get(f'/api/recipes/{recipe["id"]}/').json())
+
+    def test_queries_do_not_depend_on_page(self):
+        self.subscribe(self.authors[0])
+        self.subscribe(self.authors[1])
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(len(self.feed_ids(limit=1)), 1)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(len(self.feed_ids(limit=8)), 8)
+        self.assertEqual(len(many), len(few))
@@ -0,0 +1,188 @@
+import unittest
+from itertools import product
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.filters import RecipeFilter
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from .utils import add_flags, create_catalogue, create_user
+
+LIST_URL = '/api/recipes/'
+TAG_SETS = ((), ('lunch',), ('lunch', 'dinner'), ('breakfast', 'dinner'))
+PLAN_RECIPES = 4000
+
+
+class RecipeFilterTest(TestCase):
+    """Фильтры рецептов на всех сочетаниях параметров."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, _, cls.authors, cls.recipes = create_catalogue(recipes=16)
+        cls.user = create_user('reader')
+        add_flags(cls.user, cls.recipes, cls.authors)
+        cls.recipe_tags = {
+            recipe.pk: set(recipe.tags.values_list('slug', flat=True))
+            for recipe in cls.recipes
+        }
+        cls.favorites = set(Favorite.objects.filter(
+            user=cls.user).values_list('recipe_id', flat=True))
+        cls.cart = set(ShoppingCart.objects.filter(
+            user=cls.user).values_list('recipe_id', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expected(self, tags, mode, favorited, in_cart, author, user):
+        recipes = []
+        for recipe in sorted(
+                self.recipes, key=lambda recipe: recipe.pub_date,
+                reverse=True):
+            recipe_tags = self.recipe_tags[recipe.pk]
+            if tags:
+                if mode == 'all' and not set(tags) <= recipe_tags:
+                    continue
+                if mode != 'all' and not set(tags) & recipe_tags:
+                    continue
+            if user is not None:
+                if favorited and recipe.pk not in self.favorites:
+                    continue
+                if in_cart and recipe.pk not in self.cart:
+                    continue
+            if author is not None and recipe.author_id != author.pk:
+                continue
+            recipes.append(recipe.pk)
+        return recipes
+
+    def get_ids(self, client, params):
+        response = client.get(LIST_URL, params)
+        self.assertEqual(response.status_code, 200, params)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_combinations(self):
+        for tags, mode, favorited, in_cart, author, user in product(
+                TAG_SETS, (None, 'any', 'all'), (None, 1, 0), (None, 1),
+                (None, self.authors[1]), (self.user, None)):
+            params = {'limit': 100, 'tags': tags}
+            for name, value in (
+                    ('tags_mode', mode), ('is_favorited', favorited),
+                    ('is_in_shopping_cart', in_cart),
+                    ('author', author and author.pk)):
+                if value is not None:
+                    params[name] = value
+            client = self.client if user else APIClient()
+            with self.subTest(params=params, user=user):
+                ids = self.get_ids(client, params)
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(ids, self.expected(
+                    tags, mode, favorited, in_cart, author, user))
+
+    def test_unknown_tag(self):
+        # Несуществующий slug отклоняется валидацией MultipleChoiceFilter.
+        response = self.client.get(LIST_URL, {'tags': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_distinct_and_constant_queries(self):
+        params = {
+            'limit': 100, 'tags': ['breakfast', 'lunch', 'dinner'],
+            'tags_mode': 'any', 'is_favorited': 1,
+            'is_in_shopping_cart': 1, 'author': self.authors[0].pk,
+        }
+        self.get_ids(self.client, params)
+        with CaptureQueriesContext(connection) as queries:
+            self.get_ids(self.client, params)
+        for query in queries:
+            self.assertNotIn('DISTINCT', query['sql'])
+            self.assertNotIn('JOIN "recipes_favorite"', query['sql'])
+        few = len(queries)
+        for recipe in self.recipes:
+            Favorite.objects.get_or_create(user=self.user, recipe=recipe)
+            ShoppingCart.objects.get_or_create(user=self.user, recipe=recipe)
+        cache.clear()
+        self.get_ids(self.client, params)
+        with self.assertNumQueries(few):
+            self.get_ids(self.client, params)
+
+
+@unittest.skipUnless(
+    connection.vendor == 'sqlite',
+    'Проверяется формат EXPLAIN QUERY PLAN из SQLite.')
+class RecipeFilterPlanTest(TestCase):
+    """Планы запросов фильтра на большом сгенерированном наборе.
+
+    Каждый рецепт получает свой набор тегов по битам номера, так что
+    встречаются все сочетания. Таблица рецептов читается один раз,
+    теги и избранное проверяются поиском по индексу без DISTINCT.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(name=slug, slug=slug, color='#000000')
+            for slug in ('breakfast', 'lunch', 'dinner')
+        ]
+        cls.user = create_user('reader')
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.user, name=f'Рецепт {index}', text='Текст',
+                cooking_time=5)
+            for index in range(PLAN_RECIPES))
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+        through = Recipe.tags.through
+        through.objects.bulk_create(
+            through(recipe_id=recipe_id, tag_id=tag.pk)
+            for recipe_id in recipe_ids
+            for bit, tag in enumerate(cls.tags) if recipe_id >> bit & 1)
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.user, recipe_id=recipe_id)
+            for recipe_id in recipe_ids[::3])
+        cls.favorites = set(recipe_ids[::3])
+        cls.recipe_ids = recipe_ids
+
+    def setUp(self):
+        cache.clear()
+
+    def filtered(self, params):
+        request = Request(APIRequestFactory().get(LIST_URL))
+        request.user = self.user
+        return RecipeFilter(
+            params, queryset=Recipe.objects.all(), request=request).qs
+
+    def expected(self, bits, mode):
+        mask = sum(1 << bit for bit in bits)
+        return {
+            recipe_id for recipe_id in self.recipe_ids
+            if recipe_id in self.favorites and (
+                recipe_id & mask == mask if mode == 'all'
+                else recipe_id & mask)
+        }
+
+    def test_plans(self):
+        for mode, subqueries in (('any', 1), ('all', 2)):
+            queryset = self.filtered({
+                'tags': ['lunch', 'dinner'], 'tags_mode': mode,
+                'is_favorited': 1,
+            })
+            with self.subTest(mode=mode):
+                ids = list(queryset.values_list('pk', flat=True))
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(set(ids), self.expected((1, 2), mode))
+                plan = queryset.explain().splitlines()
+                self.assertFalse(
+                    [line for line in plan if 'DISTINCT' in line])
+                scans = [line for line in plan if ' SCAN ' in line]
+                self.assertEqual(len(scans), 1)
+                self.assertIn('recipes_recipe', scans[0])
+                searches = [line for line in plan if ' SEARCH ' in line]
+                self.assertEqual(
+                    [line for line in searches
+                     if 'recipes_recipe_tags' in line],
+                    searches[:subqueries])
+                self.assertIn('recipes_favorite', searches[subqueries])
+                self.assertEqual(len(searches), subqueries + 1)
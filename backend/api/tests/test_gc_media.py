@@ -0,0 +1,97 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe
+from .utils import create_catalogue
+
+DAY = 24 * 60 * 60
+ORPHANS = ('recipes/orphan.png', 'recipes/nested/orphan.png')
+FRESH = 'recipes/fresh.png'
+OUTSIDE = 'avatars/old.png'
+
+
+class GcMediaTest(TestCase):
+    """Удаление картинок без ссылок из MEDIA_ROOT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _, _, _, cls.recipes = create_catalogue()
+        # Импорт хранит одинаковые картинки одним файлом.
+        cls.shared = cls.recipes[1].image.name
+        Recipe.objects.filter(pk=cls.recipes[2].pk).update(image=cls.shared)
+        cls.referenced = set(Recipe.objects.exclude(
+            image='').values_list('image', flat=True))
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        old = time.time() - 2 * DAY
+        for name in (*self.referenced, *ORPHANS, FRESH, OUTSIDE):
+            self.write(name, None if name == FRESH else old)
+
+    def write(self, name, mtime):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'x' * 1024)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def path(self, name):
+        return os.path.join(settings.MEDIA_ROOT, name)
+
+    def existing(self):
+        return {
+            name for name in (*self.referenced, *ORPHANS, FRESH, OUTSIDE)
+            if os.path.exists(self.path(name))}
+
+    def gc(self, **options):
+        out = StringIO()
+        call_command('gc_media', stdout=out, **options)
+        return out.getvalue()
+
+    def test_dry_run(self):
+        output = self.gc(dry_run=True)
+        for name in ORPHANS:
+            self.assertIn(name, output)
+        self.assertIn('Будет удалено файлов: 2', output)
+        self.assertEqual(
+            self.existing(), {*self.referenced, *ORPHANS, FRESH, OUTSIDE})
+
+    def test_removes_old_orphans(self):
+        for batch_size in (1, 100):
+            with self.subTest(batch_size=batch_size):
+                self.gc(batch_size=batch_size)
+                self.assertEqual(
+                    self.existing(), {*self.referenced, FRESH, OUTSIDE})
+
+    def test_grace_period(self):
+        self.gc(grace_hours=0)
+        self.assertNotIn(FRESH, self.existing())
+        self.write(FRESH, time.time() - DAY / 2)
+        self.gc(grace_hours=24)
+        self.assertIn(FRESH, self.existing())
+        self.gc(grace_hours=6)
+        self.assertNotIn(FRESH, self.existing())
+
+    def test_shared_file_kept(self):
+        Recipe.objects.filter(pk=self.recipes[1].pk).delete()
+        self.gc()
+        self.assertIn(self.shared, self.existing())
+        Recipe.objects.filter(pk=self.recipes[2].pk).delete()
+        self.gc()
+        self.assertNotIn(self.shared, self.existing())
+
+    def test_missing_root(self):
+        with override_settings(MEDIA_ROOT=self.path('missing')):
+            with self.assertRaises(CommandError):
+                self.gc()
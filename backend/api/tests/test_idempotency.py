@@ -0,0 +1,156 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from api.idempotency import prune_idempotency_records
+from api.models import IdempotencyRecord
+from recipes.models import Favorite
+from .utils import create_catalogue, create_user
+
+
+@override_settings(IDEMPOTENCY_WAIT=0.2, IDEMPOTENCY_POLL_INTERVAL=0.01)
+class IdempotencyTest(TestCase):
+    """Повтор POST с тем же Idempotency-Key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _, _, _, cls.recipes = create_catalogue(recipes=3)
+        cls.user = create_user('reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/recipes/{self.recipes[0].pk}/favorite/'
+
+    def post(self, url=None, key='key-1'):
+        return self.client.post(url or self.url, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay(self):
+        first = self.post()
+        self.assertEqual(first.status_code, 201)
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        with mock.patch('api.views.FavoriteSerializer') as serializer:
+            second = self.post()
+        serializer.assert_not_called()
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Favorite.objects.filter(user=self.user).count(), 1)
+
+    def test_without_key(self):
+        self.assertEqual(self.client.post(self.url).status_code, 201)
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_keys_are_per_user(self):
+        self.post()
+        other = APIClient()
+        other.force_authenticate(create_user('other'))
+        response = other.post(self.url, HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+    def test_fingerprint_mismatch(self):
+        self.post()
+        response = self.post(
+            f'/api/recipes/{self.recipes[1].pk}/favorite/')
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Favorite.objects.filter(
+            user=self.user, recipe=self.recipes[1]).exists())
+
+    def claim_in_flight(self):
+        # Запись без кода ответа: запрос с этим ключом ещё выполняется.
+        self.post()
+        record = IdempotencyRecord.objects.get()
+        IdempotencyRecord.objects.filter(pk=record.pk).update(
+            status_code=None, headers=[], content=b'')
+        return record
+
+    def test_in_flight_duplicate_conflict(self):
+        self.claim_in_flight()
+        response = self.post()
+        self.assertEqual(response.status_code, 409)
+
+    def test_in_flight_duplicate_waits(self):
+        record = self.claim_in_flight()
+
+        def finish(seconds):
+            IdempotencyRecord.objects.filter(pk=record.pk).update(
+                status_code=201, headers=[], content=b'')
+
+        with mock.patch('api.idempotency.time.sleep', side_effect=finish):
+            response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+    def test_in_flight_duplicate_released(self):
+        record = self.claim_in_flight()
+        Favorite.objects.all().delete()
+
+        def release(seconds):
+            IdempotencyRecord.objects.filter(pk=record.pk).delete()
+
+        with mock.patch('api.idempotency.time.sleep', side_effect=release):
+            response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(IdempotencyRecord.objects.get().status_code, 201)
+
+    def test_raised_client_error_releases_key(self):
+        response = self.post('/api/recipes/0/favorite/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        response = self.post()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        # С освобождённым ключом выполняется исправленный запрос.
+        response = self.post(f'/api/recipes/{self.recipes[1].pk}/favorite/')
+        self.assertEqual(response.status_code, 201)
+
+    def test_server_error_releases_key(self):
+        with mock.patch(
+            'api.views.RecipeViewSet.create_object_util',
+            return_value=Response(
+                status=status.HTTP_503_SERVICE_UNAVAILABLE),
+        ):
+            self.assertEqual(self.post().status_code, 503)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        with mock.patch(
+            'api.views.RecipeViewSet.create_object_util',
+            side_effect=RuntimeError,
+        ):
+            with self.assertRaises(RuntimeError):
+                self.post()
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        self.assertEqual(self.post().status_code, 201)
+
+    def test_too_long_key(self):
+        response = self.post(key='k' * 256)
+        self.assertEqual(response.status_code, 400)
+
+    def test_expired_key_is_claimed_again(self):
+        self.post()
+        IdempotencyRecord.objects.update(
+            created_at=timezone.now() - timedelta(days=2))
+        Favorite.objects.all().delete()
+        response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+    def test_prune(self):
+        self.post()
+        self.post(f'/api/recipes/{self.recipes[1].pk}/favorite/', 'key-2')
+        IdempotencyRecord.objects.filter(key='key-1').update(
+            created_at=timezone.now() - timedelta(days=2))
+        prune_idempotency_records()
+        self.assertEqual(
+            list(IdempotencyRecord.objects.values_list('key', flat=True)),
+            ['key-2'])
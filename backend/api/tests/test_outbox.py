@@ -0,0 +1,169 @@
+import threading
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api.models import OutboxEvent
+from api.outbox import (
+    dispatch, handlers, publish, publish_many, retry_delay)
+from recipes.models import Tag
+
+
+def create_tag(key, payload):
+    Tag.objects.create(name=payload['name'], slug=key, color='#000000')
+
+
+def failing(key, payload):
+    create_tag(key, payload)
+    raise RuntimeError('Обработчик упал.')
+
+
+@override_settings(OUTBOX_EAGER=False)
+class OutboxTest(TestCase):
+    """Запись событий и их обработка с повторами."""
+
+    def setUp(self):
+        self.calls = []
+        patcher = mock.patch.dict(handlers, {
+            'test.tag': create_tag,
+            'test.failing': failing,
+            'test.record': lambda key, payload: self.calls.append(
+                (key, payload)),
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def dispatch(self):
+        return dispatch(OutboxEvent.objects.all(), 100)
+
+    def test_rolled_back_with_transaction(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                publish('test.record', 1)
+                raise ValueError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_handled_events_are_deleted(self):
+        publish('test.tag', 'first', {'name': 'Первый'})
+        stats = self.dispatch()
+        self.assertEqual(stats['handled'], 1)
+        self.assertTrue(Tag.objects.filter(slug='first').exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_coalescing(self):
+        for index in range(3):
+            publish('test.record', 1, {'index': index})
+        publish('test.record', 2, {'index': 0})
+        stats = self.dispatch()
+        self.assertEqual(stats['events'], 4)
+        self.assertEqual(stats['coalesced'], 2)
+        self.assertEqual(
+            self.calls, [('1', {'index': 2}), ('2', {'index': 0})])
+
+    def test_failed_group_is_rolled_back_and_delayed(self):
+        publish('test.failing', 'broken', {'name': 'Сломанный'})
+        publish('test.tag', 'fine', {'name': 'Рабочий'})
+        stats = self.dispatch()
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['handled'], 1)
+        # Изменения упавшего обработчика откатываются, соседние — нет.
+        self.assertFalse(Tag.objects.filter(slug='broken').exists())
+        self.assertTrue(Tag.objects.filter(slug='fine').exists())
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.status, OutboxEvent.PENDING)
+        self.assertIn('Обработчик упал.', event.error)
+        self.assertGreater(event.available_at, timezone.now())
+        # Отложенное событие не обрабатывается до available_at.
+        self.assertEqual(self.dispatch()['events'], 0)
+
+    @override_settings(
+        OUTBOX_MAX_ATTEMPTS=4, OUTBOX_RETRY_DELAY=1,
+        OUTBOX_MAX_RETRY_DELAY=5)
+    def test_backoff_until_dead(self):
+        self.assertEqual(
+            [retry_delay(attempt).total_seconds() for attempt in range(1, 5)],
+            [1, 2, 4, 5])
+        publish('test.failing', 'broken', {'name': 'Сломанный'})
+        for attempts in range(1, 5):
+            OutboxEvent.objects.update(
+                available_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(self.dispatch()['failed'], 1)
+            event = OutboxEvent.objects.get()
+            self.assertEqual(event.attempts, attempts)
+        self.assertEqual(event.status, OutboxEvent.DEAD)
+        OutboxEvent.objects.update(available_at=timezone.now())
+        self.assertEqual(self.dispatch()['events'], 0)
+
+    def test_unhandled_topic_skipped(self):
+        publish('test.unknown', 1)
+        stats = self.dispatch()
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(
+            OutboxEvent.objects.get().status, OutboxEvent.SKIPPED)
+
+    @override_settings(OUTBOX_EAGER=True)
+    def test_eager_dispatch_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            publish('test.record', 1, {'eager': True})
+            self.assertEqual(self.calls, [])
+        self.assertEqual(self.calls, [('1', {'eager': True})])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_publish_many(self):
+        with self.assertNumQueries(1):
+            publish_many('test.record', [1, 2, 2])
+        self.assertEqual(self.dispatch()['coalesced'], 1)
+        self.assertEqual(self.calls, [('1', {}), ('2', {})])
+
+    @override_settings(OUTBOX_EAGER=True)
+    def test_publish_many_eager(self):
+        publish('test.record', 'other')
+        with self.captureOnCommitCallbacks(execute=True):
+            publish_many('test.record', [1, 2])
+        self.assertEqual(self.calls, [('1', {}), ('2', {})])
+        self.assertEqual(OutboxEvent.objects.get().key, 'other')
+
+
+@unittest.skipUnless(
+    connection.features.has_select_for_update_skip_locked,
+    'SELECT ... FOR UPDATE SKIP LOCKED не поддерживается базой.')
+@override_settings(OUTBOX_EAGER=False)
+class OutboxSkipLockedTest(TransactionTestCase):
+    """Воркеры не ждут и не повторяют события, захваченные другим."""
+
+    def test_locked_events_are_skipped(self):
+        calls = []
+        locked, free = (
+            OutboxEvent.objects.create(topic='test.record', key=key)
+            for key in ('locked', 'free'))
+        locking, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                list(OutboxEvent.objects.select_for_update().filter(
+                    pk=locked.pk))
+                locking.set()
+                release.wait(5)
+            connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locking.wait(5)
+        try:
+            with mock.patch.dict(handlers, {
+                'test.record': lambda key, payload: calls.append(key),
+            }):
+                stats = dispatch(OutboxEvent.objects.all(), 100)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(stats['events'], 1)
+        self.assertEqual(calls, ['free'])
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('pk', flat=True)),
+            [locked.pk])
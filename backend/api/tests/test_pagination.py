@@ -0,0 +1,175 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from foodgram import constants
+from .utils import create_catalogue, create_user
+
+
+class UserSearchPaginationTest(TestCase):
+    """Поиск пользователей возвращает срез, который пагинируется."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('anna', 'alex', 'boris', 'arkady'):
+            create_user(name)
+        for index in range(constants.MAX_USER_SEARCH_RESULTS + 5):
+            create_user(f'a{index:03}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_search_is_paginated(self):
+        response = self.client.get('/api/users/', {'name': 'a', 'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], constants.MAX_USER_SEARCH_RESULTS)
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNotNone(data['next'])
+
+    def test_exact_username_first(self):
+        response = self.client.get('/api/users/', {'name': 'alex'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [user['username'] for user in response.json()['results']],
+            ['alex'])
+
+
+class RecipeListETagTest(TestCase):
+    """ETag списка меняется при удалении рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _, _, cls.authors, cls.recipes = create_catalogue(recipes=4)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_delete_changes_etag(self):
+        etag = self.client.get('/api/recipes/')['ETag']
+        response = self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Версии в кеше сбрасываются после коммита, которого в TestCase
+        # нет: ETag меняется только за счёт журнала изменений в БД.
+        author = APIClient()
+        author.force_authenticate(self.recipes[0].author)
+        response = author.delete(f'/api/recipes/{self.recipes[0].pk}/')
+        self.assertEqual(response.status_code, 204)
+        response = self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(
+            self.recipes[0].pk,
+            [recipe['id'] for recipe in response.json()['results']])
+
+
+class CountScopeTest(TestCase):
+    """Версия флагов входит в ключ количества, только если от неё
+    зависит выборка.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        _, _, cls.authors, cls.recipes = create_catalogue(recipes=6)
+        cls.reader = create_user('reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def count(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        counted = any('COUNT(' in query['sql'] for query in queries)
+        return response.json()['count'], counted
+
+    def favorite(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 201)
+
+    def test_plain_list_shared(self):
+        self.assertEqual(self.count('/api/recipes/'), (6, True))
+        self.favorite(self.recipes[0])
+        self.assertEqual(self.count('/api/recipes/'), (6, False))
+        anonymous = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            anonymous.get('/api/recipes/')
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+    def test_flag_filter_follows_flags(self):
+        self.assertEqual(
+            self.count('/api/recipes/', is_favorited=1), (0, True))
+        self.favorite(self.recipes[0])
+        self.assertEqual(
+            self.count('/api/recipes/', is_favorited=1), (1, True))
+        self.assertEqual(
+            self.count('/api/recipes/', is_favorited=1), (1, False))
+
+    def test_subscriptions_follow_flags(self):
+        self.assertEqual(
+            self.count('/api/users/subscriptions/'), (0, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/users/{self.authors[0].pk}/subscribe/')
+        self.assertEqual(
+            self.count('/api/users/subscriptions/'), (1, True))
+
+
+@override_settings(PAGINATION_ESTIMATE_THRESHOLD=100)
+class ApproximateCountTest(TestCase):
+    """Оценка планировщика вместо COUNT(*) для больших выборок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalogue(recipes=7)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, estimate, **params):
+        with mock.patch(
+            'api.pagination.estimate_count', return_value=estimate
+        ) as estimate_count:
+            response = self.client.get('/api/recipes/', {'limit': 3, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json(), estimate_count
+
+    def test_small_estimate_counts_exactly(self):
+        data, estimate_count = self.get(50)
+        estimate_count.assert_called_once()
+        self.assertEqual(data['count'], 7)
+        self.assertNotIn('count_is_approximate', data)
+
+    def test_large_estimate(self):
+        data, _ = self.get(1000)
+        self.assertEqual(list(data)[:2], ['count', 'count_is_approximate'])
+        self.assertEqual(data['count'], 1000)
+        self.assertTrue(data['count_is_approximate'])
+        self.assertEqual(len(data['results']), 3)
+        self.assertIsNotNone(data['next'])
+
+    def test_estimate_is_cached(self):
+        self.get(1000)
+        data, estimate_count = self.get(5)
+        estimate_count.assert_not_called()
+        self.assertEqual(data['count'], 1000)
+
+    def test_last_page_is_exact(self):
+        data, _ = self.get(1000, page=3)
+        self.assertEqual(len(data['results']), 1)
+        self.assertIsNone(data['next'])
+        self.assertEqual(data['count'], 7)
+        self.assertNotIn('count_is_approximate', data)
+
+    def test_page_past_end(self):
+        with mock.patch('api.pagination.estimate_count', return_value=1000):
+            response = self.client.get(
+                '/api/recipes/', {'limit': 3, 'page': 10})
+        self.assertEqual(response.status_code, 404)
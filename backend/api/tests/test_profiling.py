@@ -0,0 +1,94 @@
+import marshal
+import os
+import pstats
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.models import RequestProfile
+from api.profiling import ProfilingMiddleware
+from .utils import create_catalogue, create_user
+
+URL = '/api/recipes/'
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0)
+class ProfilingTest(TestCase):
+    """Профилирование по заголовку X-Profile и по частоте."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalogue()
+        cls.staff = create_user('staff')
+        cls.staff.is_staff = True
+        cls.staff.save()
+        cls.reader = create_user('reader')
+        cls.tokens = {
+            user: Token.objects.create(user=user).key
+            for user in (cls.staff, cls.reader)}
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, user=None, **headers):
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.tokens[user]}'
+        return self.client.get(URL, **headers)
+
+    def test_staff_header(self):
+        response = self.get(self.staff, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.user, self.staff)
+        self.assertEqual(profile.path, URL)
+        self.assertEqual(profile.status_code, 200)
+        self.assertEqual(profile.query_count, len(profile.queries))
+        self.assertGreater(profile.query_count, 0)
+        # Место вызова указывает на код проекта, а не на Django.
+        self.assertTrue(any(
+            line.startswith('api/')
+            for query in profile.queries for line in query['origin']))
+        self.assertIn('cumulative', profile.summary)
+        self.assertTrue(marshal.loads(bytes(profile.stats)))
+
+    def test_header_ignored_for_others(self):
+        for user in (self.reader, None):
+            with self.subTest(user=user):
+                response = self.get(user, HTTP_X_PROFILE='1')
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_disabled_by_default(self):
+        with mock.patch.object(ProfilingMiddleware, 'profile') as profile:
+            self.get(self.staff)
+        profile.assert_not_called()
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampling(self):
+        response = self.get()
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertIsNone(profile.user)
+
+    def test_admin_download(self):
+        response = self.get(self.staff, HTTP_X_PROFILE='1')
+        pk = response['X-Profile-Id']
+        url = f'/admin/api/requestprofile/{pk}/download/'
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'profile_{pk}.prof', response['Content-Disposition'])
+        stats = pstats.Stats(self.write_stats(response.content))
+        self.assertGreater(stats.total_calls, 0)
+
+    def write_stats(self, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'request.prof')
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
@@ -0,0 +1,157 @@
+import os
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api import shedding
+from api.shedding import LoadSheddingMiddleware, QueueTimeHistogram
+from foodgram import constants
+
+BUDGETS = {'download': 1, 'write': 2, 'default': 5, 'catalogue': 10}
+BUCKETS = (0.1, 1, 10)
+
+
+@override_settings(LOAD_SHEDDING_BUDGETS=BUDGETS)
+class LoadSheddingTest(SimpleTestCase):
+    """Бюджеты ожидания по классам эндпоинтов."""
+
+    def setUp(self):
+        self.histogram = QueueTimeHistogram()
+        patcher = mock.patch.object(shedding, 'histogram', self.histogram)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.middleware = LoadSheddingMiddleware(
+            lambda request: HttpResponse('ok'))
+
+    def request(self, path, waited=None, method='get'):
+        headers = {}
+        if waited is not None:
+            headers['HTTP_X_REQUEST_START'] = f't={time.time() - waited}'
+        return getattr(RequestFactory(), method)(path, **headers)
+
+    def test_endpoints(self):
+        for method, path, endpoint in (
+                ('get', '/api/recipes/', 'catalogue'),
+                ('get', '/api/recipes/12/', 'catalogue'),
+                ('get', '/api/tags/', 'catalogue'),
+                ('get', '/api/ingredients/3/', 'catalogue'),
+                ('get', '/api/recipes/feed/', 'default'),
+                ('get', '/api/recipes/12/similar/', 'default'),
+                ('get', '/api/users/me/', 'default'),
+                ('get', '/api/recipes/download_shopping_cart/', 'download'),
+                ('post', '/api/recipes/', 'write'),
+                ('delete', '/api/recipes/12/favorite/', 'write'),
+                ('get', '/unknown/', 'default')):
+            with self.subTest(method=method, path=path):
+                self.assertEqual(
+                    shedding.get_endpoint(self.request(path, method=method)),
+                    endpoint)
+
+    def test_thresholds(self):
+        for method, path, waited, status in (
+                ('get', '/api/recipes/', None, 200),
+                ('get', '/api/recipes/', 9, 200),
+                ('get', '/api/recipes/', 11, 503),
+                ('get', '/api/users/me/', 4, 200),
+                ('get', '/api/users/me/', 6, 503),
+                ('post', '/api/recipes/', 1.5, 200),
+                ('post', '/api/recipes/', 3, 503),
+                ('get', '/api/recipes/download_shopping_cart/', 0.5, 200),
+                ('get', '/api/recipes/download_shopping_cart/', 1.5, 503)):
+            with self.subTest(method=method, path=path, waited=waited):
+                response = self.middleware(
+                    self.request(path, waited, method))
+                self.assertEqual(response.status_code, status)
+                if status == 503:
+                    self.assertEqual(response['Retry-After'], '2')
+
+    def test_url_is_not_resolved(self):
+        with mock.patch(
+                'django.urls.resolvers.URLResolver.resolve',
+                side_effect=AssertionError('resolve() вызван')):
+            self.middleware(self.request('/api/recipes/', 1))
+
+    def test_bad_header_is_ignored(self):
+        request = self.request('/api/recipes/')
+        request.META['HTTP_X_REQUEST_START'] = 't=вчера'
+        self.assertEqual(self.middleware(request).status_code, 200)
+        self.assertEqual(self.histogram.pending, {})
+
+
+@override_settings(
+    LOAD_SHEDDING_BUDGETS=BUDGETS, QUEUE_TIME_FLUSH_INTERVAL=3600)
+@mock.patch.object(constants, 'QUEUE_TIME_BUCKETS', BUCKETS)
+class QueueTimeHistogramTest(SimpleTestCase):
+    """Корзины гистограммы и экспорт в формате Prometheus."""
+
+    def setUp(self):
+        cache.clear()
+        self.histogram = QueueTimeHistogram()
+
+    def observe(self):
+        for endpoint, seconds, shed in (
+                ('catalogue', 0.05, False), ('catalogue', 0.1, False),
+                ('catalogue', 0.5, False), ('catalogue', 20, True),
+                ('write', 3, True)):
+            self.histogram.observe(endpoint, seconds, shed)
+
+    def samples(self, text):
+        return dict(
+            line.rsplit(' ', 1) for line in text.splitlines()
+            if not line.startswith('#'))
+
+    def assert_catalogue(self, samples, label):
+        # Границы включают своё значение: 0.1 попадает в le="0.1".
+        for bound, count in (('0.1', 2), ('1', 3), ('10', 3), ('+Inf', 4)):
+            self.assertEqual(
+                samples[f'foodgram_queue_time_seconds_bucket'
+                        f'{{{label},le="{bound}"}}'],
+                str(count))
+        self.assertEqual(
+            samples[f'foodgram_queue_time_seconds_count{{{label}}}'], '4')
+        self.assertEqual(
+            float(samples[f'foodgram_queue_time_seconds_sum{{{label}}}']),
+            20.65)
+        self.assertEqual(
+            samples[f'foodgram_shed_requests_total{{{label}}}'], '1')
+
+    def test_buckets_stay_in_process(self):
+        self.observe()
+        self.assertEqual(
+            self.histogram.pending['catalogue'],
+            {0: 2, 1: 1, 3: 1, 'sum_ms': 20650, 'shed': 1})
+        samples = self.samples(self.histogram.export())
+        self.assert_catalogue(
+            samples, f'endpoint="catalogue",pid="{os.getpid()}"')
+        self.assertEqual(
+            samples[f'foodgram_queue_time_seconds_count'
+                    f'{{endpoint="default",pid="{os.getpid()}"}}'],
+            '0')
+        # Повторный экспорт не удваивает уже сброшенные суммы.
+        self.assertEqual(
+            self.samples(self.histogram.export()), samples)
+
+    @mock.patch.object(shedding, 'is_cache_shared', return_value=True)
+    def test_shared_cache_sums_workers(self, _):
+        self.observe()
+        other = QueueTimeHistogram()
+        other.observe('catalogue', 0.01, False)
+        other.flush()
+        samples = self.samples(self.histogram.export())
+        label = 'endpoint="catalogue"'
+        self.assertEqual(
+            samples[f'foodgram_queue_time_seconds_count{{{label}}}'], '5')
+        self.assertEqual(
+            samples[f'foodgram_queue_time_seconds_bucket'
+                    f'{{{label},le="0.1"}}'],
+            '3')
+
+    @override_settings(QUEUE_TIME_FLUSH_INTERVAL=0)
+    @mock.patch.object(shedding, 'is_cache_shared', return_value=True)
+    def test_flush_interval(self, _):
+        self.histogram.observe('write', 0.5, False)
+        self.assertEqual(self.histogram.pending, {})
+        self.assertEqual(cache.get('queue_time:write:1'), 1)
@@ -0,0 +1,120 @@
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import (
+    Ingredient, IngredientAmount, Recipe, RecipeBucket, RecipeSignature)
+from recipes.similarity import (
+    delete_stale_entries, find_similar, update_recipe_index)
+from .utils import create_user
+
+INGREDIENTS = 80
+RECIPES = 60
+PAIRS = 30
+SET_SIZE = 10
+
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+
+class SimilarRecipesTest(TestCase):
+    """Поиск похожих рецептов по MinHash/LSH-индексу.
+
+    Первые PAIRS рецептов получают пару, у которой заменён один
+    ингредиент из десяти (Жаккар 9/11), остальные наборы случайны.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {index}', measurement_unit='г')
+            for index in range(INGREDIENTS)]
+        author = create_user('author')
+        sets = [
+            set(rng.sample(ingredients, SET_SIZE)) for _ in range(RECIPES)]
+        for base in sets[:PAIRS]:
+            removed = rng.choice(sorted(base, key=lambda item: item.pk))
+            added = rng.choice(
+                [item for item in ingredients if item not in base])
+            sets.append(base - {removed} | {added})
+        cls.recipes = []
+        cls.sets = {}
+        for index, ingredient_set in enumerate(sets):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {index}', text='Текст',
+                cooking_time=5)
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(recipe=recipe, ingredient=item, amount=1)
+                for item in ingredient_set)
+            cls.recipes.append(recipe)
+            cls.sets[recipe.pk] = {item.pk for item in ingredient_set}
+        cls.pairs = [
+            (cls.recipes[index].pk, cls.recipes[RECIPES + index].pk)
+            for index in range(PAIRS)]
+        cls.empty = Recipe.objects.create(
+            author=author, name='Пустой', text='Текст', cooking_time=5)
+        call_command(
+            'build_similarity_index', workers=1, chunk_size=25,
+            stdout=StringIO())
+
+    def test_index_built(self):
+        self.assertEqual(RecipeSignature.objects.count(), len(self.recipes))
+        self.assertFalse(RecipeSignature.objects.filter(
+            recipe=self.empty).exists())
+        self.assertEqual(find_similar(self.empty.pk, 5), [])
+
+    def test_near_duplicates_recalled(self):
+        hits = sum(
+            find_similar(first, 1) == [second]
+            and find_similar(second, 1) == [first]
+            for first, second in self.pairs)
+        self.assertGreaterEqual(hits / len(self.pairs), 0.95)
+
+    def test_ordered_by_jaccard(self):
+        for recipe_id, _ in self.pairs[:5]:
+            similar = find_similar(recipe_id, 5)
+            scores = [
+                jaccard(self.sets[recipe_id], self.sets[other])
+                for other in similar]
+            with self.subTest(recipe_id=recipe_id):
+                self.assertNotIn(recipe_id, similar)
+                self.assertEqual(scores[0], max(scores))
+                self.assertAlmostEqual(scores[0], 9 / 11)
+
+    def test_incremental_update(self):
+        first, second = self.pairs[0]
+        target = self.recipes[-1]
+        IngredientAmount.objects.filter(recipe=target).delete()
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=target, ingredient_id=ingredient_id, amount=1)
+            for ingredient_id in self.sets[first])
+        update_recipe_index(target.pk)
+        self.assertEqual(find_similar(first, 1), [target.pk])
+        self.assertIn(second, find_similar(first, 2))
+        IngredientAmount.objects.filter(recipe=target).delete()
+        update_recipe_index(target.pk)
+        self.assertFalse(RecipeBucket.objects.filter(recipe=target).exists())
+        self.assertNotIn(target.pk, find_similar(first, 5))
+
+    def test_stale_entries_dropped(self):
+        first, _ = self.pairs[0]
+        IngredientAmount.objects.filter(recipe_id=first).delete()
+        self.assertEqual(delete_stale_entries(), 1)
+        self.assertEqual(find_similar(first, 5), [])
+
+    def test_endpoint(self):
+        first, second = self.pairs[1]
+        response = self.client.get(
+            f'/api/recipes/{first}/similar/', {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()], [second])
+        response = self.client.get(
+            f'/api/recipes/{self.empty.pk + 1}/similar/')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,150 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.models import OutboxEvent, SlowQuery
+from api.outbox import dispatch
+from api.profiling import (
+    REDACTED, normalize_sql, prune_slow_queries, redact_params)
+from foodgram import constants
+from .utils import create_user
+
+
+class RedactionTest(SimpleTestCase):
+    """Нормализация SQL и скрытие строковых параметров."""
+
+    def test_normalize_sql(self):
+        first = normalize_sql(
+            "SELECT * FROM users_user WHERE email = 'a@b.c' AND id IN "
+            "(1, 2, 3) LIMIT 21")
+        second = normalize_sql(
+            "SELECT *\n  FROM users_user WHERE email = 'it''s@x.y' "
+            "AND id IN (7) LIMIT 5")
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first,
+            'SELECT * FROM users_user WHERE email = ? AND id IN (...) '
+            'LIMIT ?')
+        self.assertEqual(
+            normalize_sql('SELECT %s FROM t WHERE id IN (%s, %s)'),
+            'SELECT ? FROM t WHERE id IN (...)')
+
+    def test_redact_params(self):
+        day = date(2024, 1, 2)
+        self.assertEqual(
+            redact_params(
+                ['secret@example.com', 5, 1.5, Decimal('2'), True, None,
+                 day, ['token', 3]]),
+            [REDACTED, 5, 1.5, Decimal('2'), True, None, day,
+             [REDACTED, 3]])
+        self.assertEqual(
+            redact_params({'email': 'a@b.c', 'id': 1}),
+            {'email': REDACTED, 'id': 1})
+        self.assertIsNone(redact_params(None))
+
+
+@override_settings(OUTBOX_EAGER=False, SLOW_QUERY_THRESHOLD_MS=1e-6)
+class SlowQueryMiddlewareTest(TestCase):
+    """Запись медленных запросов и снятие планов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self):
+        return self.client.get(
+            '/api/users/', {'name': 'secret-term'},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_strings_are_not_stored(self):
+        self.assertEqual(self.request().status_code, 200)
+        samples = list(SlowQuery.objects.all())
+        self.assertTrue(samples)
+        stored = json.dumps(
+            [[sample.params, sample.statement] for sample in samples],
+            default=str, ensure_ascii=False)
+        for secret in (self.token.key, 'secret-term', self.user.email):
+            self.assertNotIn(secret, stored)
+        self.assertIn(REDACTED, stored)
+        # Поиск по имени действительно дошёл до БД.
+        self.assertTrue(any(
+            'LIKE' in sample.statement for sample in samples))
+        self.assertTrue(all(
+            sample.view.startswith('GET api:') for sample in samples))
+
+    def test_plan_once_per_fingerprint(self):
+        self.request()
+        fingerprints = set(
+            SlowQuery.objects.values_list('fingerprint', flat=True))
+        self.assertEqual(
+            set(OutboxEvent.objects.filter(
+                topic='slowquery.recorded').values_list('key', flat=True)),
+            fingerprints)
+        dispatch(OutboxEvent.objects.all(), 1000)
+        planned = SlowQuery.objects.exclude(plan='')
+        self.assertEqual(
+            sorted(planned.values_list('fingerprint', flat=True)),
+            sorted(fingerprints))
+        # Свежий план не снимается повторно.
+        self.request()
+        dispatch(OutboxEvent.objects.all(), 1000)
+        self.assertEqual(planned.count(), len(fingerprints))
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_disabled(self):
+        self.request()
+        self.assertFalse(SlowQuery.objects.exists())
+
+    @override_settings(SLOW_QUERY_MAX_PER_REQUEST=2)
+    def test_limit_per_request(self):
+        self.request()
+        self.assertEqual(SlowQuery.objects.count(), 2)
+
+
+class SlowQueryPruneTest(TestCase):
+    """Очистка журнала медленных запросов."""
+
+    def setUp(self):
+        now = timezone.now()
+        for fingerprint, age in (('old', 10), ('week', 6), ('new', 0)):
+            sample = SlowQuery.objects.create(
+                fingerprint=fingerprint, statement='SELECT ?', sql='SELECT 1',
+                view='GET api:tags-list', duration_ms=age + 1)
+            SlowQuery.objects.filter(pk=sample.pk).update(
+                created_at=now - timedelta(days=age))
+
+    def remaining(self):
+        return set(SlowQuery.objects.values_list('fingerprint', flat=True))
+
+    @mock.patch.object(constants, 'SLOW_QUERY_RETENTION_DAYS', 7)
+    def test_periodic_prune(self):
+        prune_slow_queries()
+        self.assertEqual(self.remaining(), {'week', 'new'})
+
+    def test_command_prune(self):
+        out = StringIO()
+        call_command('slow_queries', prune=True, hours=24, stdout=out)
+        self.assertIn('Удалено: 2.', out.getvalue())
+        self.assertEqual(self.remaining(), {'new'})
+
+    def test_command_report(self):
+        out = StringIO()
+        call_command('slow_queries', hours=24 * 30, order='max', stdout=out)
+        lines = [
+            line for line in out.getvalue().splitlines() if '. ' in line
+            and 'вызовов' in line]
+        self.assertEqual(
+            [line.split(':')[0] for line in lines],
+            ['1. old', '2. week', '3. new'])
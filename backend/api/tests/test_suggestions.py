@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe
+from users.models import AuthorSuggestion, Follow
+from users.suggestions import rebuild_suggestions
+from .utils import create_user
+
+URL = '/api/users/suggestions/'
+
+
+class AuthorSuggestionsTest(TestCase):
+    """Рекомендации авторов по совместным подпискам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.first, cls.second, cls.third, cls.fourth = (
+            create_user(f'author{index}') for index in range(4))
+        others = [create_user(f'other{index}') for index in range(3)]
+        follows = [
+            (cls.reader, cls.first),
+            (others[0], cls.first), (others[0], cls.second),
+            (others[1], cls.first), (others[1], cls.second),
+            (others[2], cls.first), (others[2], cls.third),
+            # Подписка на самого читателя не должна вернуться ему же.
+            (others[0], cls.reader),
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author) for user, author in follows)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def suggested(self, user):
+        return list(AuthorSuggestion.objects.filter(
+            user=user).values_list('author_id', 'score'))
+
+    def test_co_follows_ordered_by_score(self):
+        rebuild_suggestions(top_k=10, favorite_weight=0.5, block_size=2)
+        self.assertEqual(
+            self.suggested(self.reader),
+            [(self.second.pk, 2.0), (self.third.pk, 1.0)])
+
+    def test_favorites_add_weight(self):
+        recipe = Recipe.objects.create(
+            author=self.fourth, name='Рецепт', text='Текст', cooking_time=5)
+        fan = create_user('fan')
+        Favorite.objects.create(user=fan, recipe=recipe)
+        Follow.objects.create(user=fan, author=self.first)
+        rebuild_suggestions(top_k=10, favorite_weight=0.5, block_size=100)
+        self.assertEqual(
+            self.suggested(self.reader),
+            [(self.second.pk, 2.0), (self.third.pk, 1.0),
+             (self.fourth.pk, 0.5)])
+        self.assertNotIn(
+            self.first.pk,
+            [author for author, _ in self.suggested(fan)])
+
+    def test_top_k(self):
+        rebuild_suggestions(top_k=1, favorite_weight=0.5, block_size=100)
+        self.assertEqual(
+            self.suggested(self.reader), [(self.second.pk, 2.0)])
+
+    def test_view(self):
+        rebuild_suggestions()
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {
+                'email': author.email, 'id': author.pk,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name, 'is_subscribed': False,
+            }
+            for author in (self.second, self.third)
+        ])
+        self.assertEqual(
+            [author['id'] for author in self.client.get(
+                URL, {'limit': 1}).json()],
+            [self.second.pk])
+
+    def test_view_hides_new_follows(self):
+        rebuild_suggestions()
+        self.client.post(f'/api/users/{self.second.pk}/subscribe/')
+        self.assertEqual(
+            [author['id'] for author in self.client.get(URL).json()],
+            [self.third.pk])
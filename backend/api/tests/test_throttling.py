@@ -0,0 +1,158 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.throttling import (
+    IngredientSearchThrottle, ShoppingCartDownloadThrottle,
+    WeightedRateThrottle)
+from foodgram import constants
+from recipes.models import Ingredient, IngredientAmount, ShoppingCart
+from .utils import create_catalogue, create_user
+
+RATES = {
+    'test': '10/min',
+    'ingredients': '10/min',
+    'download_shopping_cart': '10/min',
+}
+
+
+class CostThrottle(WeightedRateThrottle):
+    scope = 'test'
+
+    def __init__(self, cost=1):
+        super().__init__()
+        self.cost = cost
+
+    def get_cost(self, request, view):
+        return self.cost
+
+
+@mock.patch.object(WeightedRateThrottle, 'THROTTLE_RATES', RATES)
+class WeightedRateThrottleTest(TestCase):
+    """Скользящее окно: цена запроса, возврат токенов и Retry-After."""
+
+    def setUp(self):
+        cache.clear()
+        # Начало отрезка окна: ожидание считается от границ отрезков.
+        self.now = 960.0
+        self.request = self.make_request('/api/ingredients/')
+
+    def make_request(self, path, user=None, **params):
+        request = Request(APIRequestFactory().get(path, params))
+        if user is not None:
+            request.user = user
+        return request
+
+    def allow(self, cost=1, throttle_class=CostThrottle, request=None):
+        throttle = (
+            throttle_class(cost) if throttle_class is CostThrottle
+            else throttle_class())
+        throttle.timer = lambda: self.now
+        allowed = throttle.allow_request(request or self.request, None)
+        return allowed, throttle.wait()
+
+    def test_limit(self):
+        for _ in range(10):
+            self.assertTrue(self.allow()[0])
+        allowed, wait = self.allow()
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 60)
+
+    def test_cost(self):
+        self.assertTrue(self.allow(cost=8)[0])
+        self.assertFalse(self.allow(cost=5)[0])
+        # Отказ возвращает списанное: остаток прежний.
+        self.assertTrue(self.allow(cost=2)[0])
+        self.assertFalse(self.allow()[0])
+
+    def test_cost_above_capacity(self):
+        self.assertTrue(self.allow(cost=100)[0])
+        self.assertFalse(self.allow()[0])
+
+    def test_refill(self):
+        slot = 60 / constants.THROTTLE_WINDOW_SLOTS
+        self.assertTrue(self.allow(cost=6)[0])
+        self.now += 3 * slot
+        self.assertTrue(self.allow(cost=4)[0])
+        allowed, wait = self.allow(cost=5)
+        self.assertFalse(allowed)
+        # Первые 6 токенов вернутся, когда их отрезок выйдет из окна.
+        self.assertAlmostEqual(wait, 60 - 3 * slot)
+        self.now += wait
+        self.assertTrue(self.allow(cost=5)[0])
+        self.assertFalse(self.allow(cost=2)[0])
+        self.now += 60
+        self.assertTrue(self.allow(cost=10)[0])
+
+    def test_clients_are_separate(self):
+        self.assertTrue(self.allow(cost=10)[0])
+        other = self.make_request(
+            '/api/ingredients/', user=create_user('other'))
+        self.assertTrue(self.allow(cost=10, request=other)[0])
+        self.assertFalse(self.allow()[0])
+
+    def test_short_ingredient_search_costs_more(self):
+        short = self.make_request('/api/ingredients/', name='a')
+        long = self.make_request('/api/ingredients/', name='абрикос')
+        self.assertTrue(
+            self.allow(throttle_class=IngredientSearchThrottle,
+                       request=short)[0])
+        self.assertTrue(
+            self.allow(throttle_class=IngredientSearchThrottle,
+                       request=short)[0])
+        self.assertFalse(
+            self.allow(throttle_class=IngredientSearchThrottle,
+                       request=long)[0])
+
+
+@mock.patch.object(WeightedRateThrottle, 'THROTTLE_RATES', RATES)
+class ThrottledViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, cls.ingredients, _, cls.recipes = create_catalogue()
+        cls.user = create_user('reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_retry_after(self):
+        statuses = [
+            self.client.get('/api/ingredients/', {'name': 'a'}).status_code
+            for _ in range(2)
+        ]
+        self.assertEqual(statuses, [200, 200])
+        response = self.client.get('/api/ingredients/', {'name': 'a'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertLessEqual(int(response['Retry-After']), 60)
+
+    def test_download_charges_by_list_size(self):
+        extra = [
+            Ingredient.objects.create(
+                name=f'ингредиент {index}', measurement_unit='г')
+            for index in range(30)
+        ]
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=self.recipes[1], ingredient=ingredient, amount=1)
+            for ingredient in extra)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        lines = response.content.decode().count('\n')
+        self.assertEqual(lines, 33)
+        # Один токен на запрос и ещё по одному на каждые 10 строк списка.
+        throttle = ShoppingCartDownloadThrottle()
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.user
+        key = throttle.get_cache_key(request, None)
+        _, slots = throttle.get_slots(throttle.timer())
+        self.assertEqual(cache.get(f'{key}:{slots[-1]}'), 1 + 33 // 10)
@@ -0,0 +1,131 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api.models import OutboxEvent
+from api.outbox import dispatch
+from recipes import transfer
+from recipes.models import FeedEntry, IngredientAmount, Recipe, Tag
+from recipes.transfer import RECIPES_FILE
+from users.models import Follow, User
+from .utils import create_catalogue, create_user
+
+PNG = b'\x89PNG\r\n\x1a\n'
+
+
+def temporary_directory(test):
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    return directory.name
+
+
+@override_settings(OUTBOX_EAGER=False)
+class RecipeTransferTest(TestCase):
+    """Выгрузка и загрузка рецептов между экземплярами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, _, cls.authors, cls.recipes = create_catalogue()
+        cls.follower = create_user('follower')
+        Follow.objects.create(user=cls.follower, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        media = override_settings(MEDIA_ROOT=temporary_directory(self))
+        media.enable()
+        self.addCleanup(media.disable)
+        # Два рецепта с одинаковой картинкой дают один файл выгрузки.
+        for recipe in self.recipes:
+            if recipe.image:
+                default_storage.save(recipe.image.name, ContentFile(
+                    PNG + (b'same' if recipe.pk % 2 else bytes(recipe.pk))))
+        self.directory = temporary_directory(self)
+
+    def run_command(self, name, *args, **options):
+        call_command(
+            name, *args, batch_size=5, workers=2, stdout=StringIO(),
+            **options)
+
+    def export(self, directory=None):
+        directory = directory or temporary_directory(self)
+        self.run_command('export_recipes', directory)
+        with open(os.path.join(directory, RECIPES_FILE), 'rb') as dump:
+            return dump.read()
+
+    def wipe(self):
+        Recipe.objects.all().delete()
+        Tag.objects.all().delete()
+        User.objects.filter(pk__in=[
+            author.pk for author in self.authors]).delete()
+        OutboxEvent.objects.all().delete()
+
+    def test_round_trip(self):
+        exported = self.export(self.directory)
+        images = os.listdir(os.path.join(self.directory, transfer.IMAGES_DIR))
+        self.assertEqual(len(images), len({
+            recipe.pk for recipe in self.recipes
+            if recipe.image and recipe.pk % 2 == 0}) + 1)
+        self.wipe()
+        self.run_command('import_recipes', self.directory)
+        self.assertEqual(Recipe.objects.count(), len(self.recipes))
+        self.assertEqual(self.export(), exported)
+        # Повторный импорт узнаёт уже перенесённые рецепты.
+        self.run_command('import_recipes', self.directory, restart=True)
+        self.assertEqual(Recipe.objects.count(), len(self.recipes))
+
+    def test_import_publishes_created(self):
+        self.export(self.directory)
+        Recipe.objects.all().delete()
+        OutboxEvent.objects.all().delete()
+        self.run_command('import_recipes', self.directory)
+        imported = set(Recipe.objects.values_list('pk', flat=True))
+        self.assertEqual(
+            set(OutboxEvent.objects.filter(
+                topic='recipe.created').values_list('key', flat=True)),
+            {str(pk) for pk in imported})
+        dispatch(OutboxEvent.objects.all(), 1000)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(
+                user=self.follower).values_list('recipe_id', flat=True)),
+            set(Recipe.objects.filter(
+                author=self.authors[0]).values_list('pk', flat=True)))
+
+    def interrupt(self, name, target):
+        """Команда падает на второй пачке после записи первой."""
+        calls = []
+
+        def failing(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return target(*args)
+
+        with mock.patch(
+                f'recipes.management.commands.{name}.{target.__name__}',
+                failing), self.assertRaises(KeyboardInterrupt):
+            self.run_command(name, self.directory)
+
+    def test_export_resumes(self):
+        expected = self.export()
+        self.interrupt('export_recipes', transfer.export_batch)
+        self.assertEqual(self.export(self.directory), expected)
+
+    def test_import_resumes(self):
+        self.export(self.directory)
+        self.wipe()
+        self.interrupt('import_recipes', transfer.import_batch)
+        self.assertEqual(Recipe.objects.count(), 5)
+        self.run_command('import_recipes', self.directory)
+        self.assertEqual(Recipe.objects.count(), len(self.recipes))
+        self.assertEqual(
+            IngredientAmount.objects.count(), 3 * len(self.recipes))
+        self.assertEqual(
+            OutboxEvent.objects.filter(topic='recipe.created').count(),
+            len(self.recipes))
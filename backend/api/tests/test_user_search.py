@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .utils import create_user
+
+
+class UserSearchTest(TestCase):
+    """Поиск по началу имени действует только на список пользователей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anna = create_user('anna')
+        cls.boris = create_user('boris')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.anna)
+
+    def test_detail_ignores_search(self):
+        for user in (self.anna, self.boris):
+            with self.subTest(user=user):
+                response = self.client.get(
+                    f'/api/users/{user.pk}/', {'name': 'a'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['id'], user.pk)
+
+    def test_me_ignores_search(self):
+        response = self.client.get('/api/users/me/', {'name': 'b'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.anna.pk)
+
+    def test_list_is_filtered(self):
+        response = self.client.get('/api/users/', {'name': 'bor'})
+        self.assertEqual(
+            [user['id'] for user in response.json()['results']],
+            [self.boris.pk])
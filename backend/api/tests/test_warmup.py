@@ -0,0 +1,64 @@
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api import warmup
+from .utils import create_catalogue
+
+
+class WarmupTest(TestCase):
+    """Прогрев воркера и замер первого запроса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, cls.ingredients, _, _ = create_catalogue()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_phases(self):
+        timings = warmup.warmup(prime=False)
+        self.assertEqual(
+            list(timings), [name for name, _ in warmup.IN_MEMORY_PHASES])
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+        self.assertIn('caches', warmup.warmup())
+
+    def test_catalogue_served_from_cache(self):
+        warmup.warmup()
+        for path in warmup.CATALOGUE_PATHS:
+            with self.subTest(path=path), self.assertNumQueries(0):
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(self.client.get('/api/tags/').json()), len(self.tags))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('warmup', probe='/api/tags/', stdout=out)
+        output = out.getvalue()
+        for name, _ in warmup.IN_MEMORY_PHASES:
+            self.assertIn(f'{name}: ', output)
+        self.assertIn('Прогрев: ', output)
+        self.assertIn('Первый запрос /api/tags/: 200', output)
+        self.assertIn('Второй запрос /api/tags/: 200', output)
+
+    def test_command_without_warmup(self):
+        out = StringIO()
+        call_command('warmup', no_warmup=True, probe='/api/tags/', stdout=out)
+        self.assertNotIn('Прогрев: ', out.getvalue())
+        self.assertIn('Первый запрос /api/tags/: 200', out.getvalue())
+
+    def test_app_ready(self):
+        config = apps.get_app_config('api')
+        with mock.patch.object(warmup, 'warmup') as warm:
+            with override_settings(WARMUP_ON_READY=False):
+                config.ready()
+            warm.assert_not_called()
+            with override_settings(WARMUP_ON_READY=True):
+                config.ready()
+        # В ready() база недоступна: кеши не заполняются.
+        warm.assert_called_once_with(prime=False)
@@ -0,0 +1,60 @@
+from recipes.documents import rebuild_documents
+from recipes.models import (
+    Favorite, Ingredient, IngredientAmount, Recipe, ShoppingCart, Tag)
+from users.models import Follow, User
+
+
+def create_user(username):
+    return User.objects.create_user(
+        email=f'{username}@example.com', username=username,
+        password='secret-password', first_name=username.title(),
+        last_name='Тестов')
+
+
+def create_catalogue(users=3, recipes=12):
+    """Теги, ингредиенты, авторы и рецепты с разными наборами связей.
+
+    Рецепты создаются напрямую через ORM, документы пересобираются
+    одним вызовом в конце.
+    """
+    tags = [
+        Tag.objects.create(name=name, slug=slug, color=color)
+        for name, slug, color in (
+            ('Завтрак', 'breakfast', '#E26C2DFF'),
+            ('Обед', 'lunch', '#49B64EFF'),
+            ('Ужин', 'dinner', '#8775D2FF'),
+        )
+    ]
+    ingredients = [
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+        for name, unit in (
+            ('яйца', 'шт.'), ('мука', 'г'), ('молоко', 'мл'),
+            ('соль', 'по вкусу'), ('абрикосы', 'г'),
+        )
+    ]
+    authors = [create_user(f'author{index}') for index in range(users)]
+    created = []
+    for index in range(recipes):
+        recipe = Recipe.objects.create(
+            author=authors[index % users], name=f'Рецепт {index}',
+            text=f'Описание рецепта {index}', cooking_time=5 + index,
+            image=f'recipes/images/recipe{index}.png' if index % 4 else '')
+        recipe.tags.set(tags[:index % (len(tags) + 1)])
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=recipe, ingredient=ingredient, amount=index + 1)
+            for ingredient in ingredients[index % 3:index % 3 + 3]
+        )
+        created.append(recipe)
+    rebuild_documents([recipe.pk for recipe in created])
+    return tags, ingredients, authors, created
+
+
+def add_flags(user, recipes, authors):
+    """Избранное, корзина и подписки, пересекающиеся не полностью."""
+    Favorite.objects.bulk_create(
+        Favorite(user=user, recipe=recipe) for recipe in recipes[::2])
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe=recipe) for recipe in recipes[::3])
+    Follow.objects.bulk_create(
+        Follow(user=user, author=author) for author in authors[:1])
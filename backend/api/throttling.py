@@ -0,0 +1,126 @@
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from foodgram import constants
+from .pagination import get_limit_param
+
+
+class WeightedRateThrottle(SimpleRateThrottle):
+    """Троттлинг по скользящему окну с ценой запроса.
+
+    Окно делится на THROTTLE_WINDOW_SLOTS отрезков, расход каждого
+    хранится счётчиком в кеше. Запрос сначала прибавляет свою цену к
+    текущему отрезку атомарным cache.incr, затем сверяет сумму окна с
+    лимитом и при превышении возвращает цену обратно. Блокировок нет:
+    параллельные запросы одного клиента видят списания друг друга и
+    вместе лимит не превышают. Токены возвращаются по мере выхода
+    старых отрезков из окна. Дорогие запросы списывают больше токенов,
+    см. get_cost.
+    """
+    cache = default_cache
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    wait_time = None
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def get_cost(self, request, view):
+        """Сколько токенов списывает запрос."""
+        return 1
+
+    def get_slots(self, now):
+        """Длина отрезка и номера отрезков окна, от старого к текущему."""
+        length = self.duration / constants.THROTTLE_WINDOW_SLOTS
+        current = int(now // length)
+        return length, range(
+            current - constants.THROTTLE_WINDOW_SLOTS + 1, current + 1)
+
+    def spend(self, key, slot, cost):
+        """Атомарное списание с отрезка; возвращает его расход."""
+        slot_key = f'{key}:{slot}'
+        # Отрезок живёт, пока входит в окно.
+        if self.cache.add(slot_key, cost, self.duration + 1):
+            return cost
+        try:
+            return self.cache.incr(slot_key, cost)
+        except ValueError:
+            # Счётчик истёк между add и incr.
+            self.cache.set(slot_key, cost, self.duration + 1)
+            return cost
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        cost = min(self.get_cost(request, view), self.num_requests)
+        now = self.timer()
+        length, slots = self.get_slots(now)
+        spent = self.cache.get_many([f'{key}:{slot}' for slot in slots[:-1]])
+        history = [spent.get(f'{key}:{slot}', 0) for slot in slots[:-1]]
+        excess = sum(history) + self.spend(key, slots[-1], cost) - (
+            self.num_requests)
+        if excess <= 0:
+            return True
+        self.cache.decr(f'{key}:{slots[-1]}', cost)
+        # Ждать, пока из окна выйдут отрезки с нужным числом токенов.
+        freed, free_slot = 0, slots[-1]
+        for slot, count in zip(slots, history):
+            freed += count
+            if freed >= excess:
+                free_slot = slot
+                break
+        self.wait_time = (
+            (free_slot + constants.THROTTLE_WINDOW_SLOTS) * length - now)
+        return False
+
+    def charge(self, request, view, cost):
+        """Списание сверх get_cost, когда цена известна после ответа."""
+        key = self.get_cache_key(request, view)
+        if self.rate is None or key is None or cost <= 0:
+            return
+        _, slots = self.get_slots(self.timer())
+        self.spend(key, slots[-1], cost)
+
+    def wait(self):
+        return self.wait_time
+
+
+class ShoppingCartDownloadThrottle(WeightedRateThrottle):
+    """Скачивание списка покупок: цена растёт с размером списка.
+
+    Запрос списывает один токен, остальное списывает view через charge,
+    когда список уже собран: отдельный COUNT по корзине не нужен.
+    """
+    scope = 'download_shopping_cart'
+
+
+class SubscriptionsThrottle(WeightedRateThrottle):
+    """Список подписок: цена зависит от limit и recipes_limit."""
+    scope = 'subscriptions'
+
+    def get_cost(self, request, view):
+        limit = get_limit_param(
+            request, 'limit', api_settings.PAGE_SIZE,
+            constants.MAX_PAGE_SIZE)
+        recipes_limit = get_limit_param(
+            request, 'recipes_limit', constants.MAX_RECIPES_LIMIT,
+            constants.MAX_RECIPES_LIMIT, minimum=0)
+        return 1 + limit * recipes_limit // constants.SUBSCRIPTIONS_COST_STEP
+
+
+class IngredientSearchThrottle(WeightedRateThrottle):
+    """Поиск ингредиентов: короткий префикс дороже длинного."""
+    scope = 'ingredients'
+
+    def get_cost(self, request, view):
+        search = request.query_params.get(api_settings.SEARCH_PARAM, '')
+        if len(search) < constants.MIN_INGREDIENT_SEARCH_LENGTH:
+            return constants.SHORT_INGREDIENT_SEARCH_COST
+        return 1
@@ -13,6 +13,8 @@ router.register(
     'ingredients', views.IngredientViewSet, basename='ingredients')
 
 urlpatterns = [
+    path('bootstrap/', views.BootstrapView.as_view(), name='bootstrap'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,49 +1,96 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef, Sum
 from django_filters.rest_framework import DjangoFilterBackend
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from djoser import views
+from django.utils import timezone
+from djoser import utils, views
 
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import (
     AllowAny,
+    IsAdminUser,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .filters import RecipeFilter
-from .pagination import LimitPaginator
+from .cache import CatalogueCacheMixin
+from .conditional import ConditionalRecipeMixin
+from .fast_read import (
+    AUTHOR_FIELDS, FastRecipeReadMixin, get_all_user_flags, get_tags_by_id,
+    serialize_recipes)
+from .fields import SparseFieldsMixin, get_requested_fields
+from .filters import RecipeFilter, UserSearchFilter
+from .idempotency import idempotent
+from .outbox import publish
+from .pagination import (
+    BootstrapRecipesPaginator, LimitPaginator, get_limit_param)
 from .permissions import IsAuthorOrReadOnly
+from .shedding import histogram
+from foodgram import constants
+from recipes.deletion import delete_recipes, delete_user_account
+from recipes.feed import Feed, prune_feed
+from recipes.similarity import find_similar
 from recipes.models import (
-    Recipe, Ingredient, Favorite,
+    Recipe, RecipeChange, Ingredient, Favorite,
     ShoppingCart, Tag)
+from .throttling import (
+    IngredientSearchThrottle, ShoppingCartDownloadThrottle,
+    SubscriptionsThrottle)
 from .serializers import (
     FavoriteSerializer, ShoppingCartSerializer,
     IngredientSerializer, TagSerializer,
     RecipeReadSerializer, RecipeWriteSerializer,
-    FollowSerializer, FollowListSerializer)
-from users.models import Follow
+    FollowSerializer, FollowListSerializer, RecipeShortSerializer)
+from users.models import AuthorSuggestion, Follow
 
 
 User = get_user_model()
 
 
-class UserViewSet(views.UserViewSet):
+class UserViewSet(SparseFieldsMixin, views.UserViewSet):
     """Получение пользователей."""
     queryset = User.objects.all()
-    filter_backends = (SearchFilter,)
-    search_fields = ('username',)
+    filter_backends = (UserSearchFilter,)
     pagination_class = LimitPaginator
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    # Для LimitPaginator: количество подписок зависит от флагов.
+    count_depends_on_flags = False
+
+    def annotate_fields(self, queryset, serializer_class):
+        """Аннотации только для выводимых полей вместо запроса на объект."""
+        fields = self.get_requested_fields(serializer_class)
+        if fields is None:
+            fields = serializer_class.Meta.fields
+        user = self.request.user
+        if user.is_authenticated and 'is_subscribed' in fields:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))))
+        if 'recipes_count' in fields:
+            # Meta.ordering не применяется к запросам с GROUP BY.
+            queryset = queryset.annotate(
+                recipes_count=Count('recipes', distinct=True)
+            ).order_by(*queryset.model._meta.ordering)
+        return queryset
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return self.annotate_fields(queryset, self.get_serializer_class())
 
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def subscribe(self, request, id):
         if request.method == 'POST':
             author = get_object_or_404(User, id=id)
@@ -52,7 +99,11 @@ class UserViewSet(views.UserViewSet):
                 context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
+                publish(
+                    'follow.created', f'{request.user.id}:{author.id}',
+                    {'user_id': request.user.id, 'author_id': author.id})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
@@ -65,45 +116,82 @@ class UserViewSet(views.UserViewSet):
                     {'errors': 'Вы не подписаны на этого пользователя'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            prune_feed(request.user.id, author.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_401_UNAUTHORIZED)
 
     @action(
         detail=False,
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(SubscriptionsThrottle,),
+        count_depends_on_flags=True
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(subscribing__user=self.request.user)
+        queryset = self.annotate_fields(
+            User.objects.filter(subscribing__user=self.request.user),
+            FollowListSerializer)
         pages = self.paginate_queryset(queryset)
         serializer = FollowListSerializer(
             pages,
             many=True,
+            fields=self.get_requested_fields(FollowListSerializer),
             context={'request': request})
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,)
+    )
+    def suggestions(self, request):
+        """Авторы, на которых стоит подписаться."""
+        limit = get_limit_param(
+            request, 'limit', constants.SUGGESTIONS_TOP_K,
+            constants.SUGGESTIONS_TOP_K)
+        authors = AuthorSuggestion.objects.filter(
+            user=request.user
+        ).exclude(
+            author__in=Follow.objects.filter(
+                user=request.user).values('author')
+        ).values_list(
+            *(f'author__{field}' for field in AUTHOR_FIELDS)
+        )[:limit]
+        return Response([
+            {**dict(zip(AUTHOR_FIELDS, author)), 'is_subscribed': False}
+            for author in authors
+        ])
+
+    def perform_destroy(self, instance):
+        if instance == self.request.user:
+            utils.logout_user(self.request)
+        delete_user_account(instance)
+
     def get_permissions(self):
         if self.action == 'me':
             self.permission_classes = [IsAuthenticated, ]
         return super(UserViewSet, self).get_permissions()
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogueCacheMixin, viewsets.ReadOnlyModelViewSet):
+    catalogue_name = 'ingredients'
     queryset = Ingredient.objects.all()
     permission_classes = (AllowAny, )
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = (SearchFilter,)
     search_fields = ('^name', )
+    throttle_classes = (IngredientSearchThrottle,)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogueCacheMixin, viewsets.ReadOnlyModelViewSet):
+    catalogue_name = 'tags'
     permission_classes = (AllowAny, )
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalRecipeMixin, FastRecipeReadMixin,
+                    SparseFieldsMixin, viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
@@ -117,9 +205,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
     @staticmethod
     def create_object_util(request, instance, serializer_name):
         """Функция для создания объекта избранного или списка покупок."""
@@ -133,6 +228,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=(IsAuthenticated,))
+    @idempotent
     def favorite(self, request, pk):
         recipe = get_object_or_404(Recipe, pk=pk)
         if request.method == 'POST':
@@ -152,6 +248,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=(IsAuthenticated,))
+    @idempotent
     def shopping_cart(self, request, pk):
         recipe = get_object_or_404(Recipe, pk=pk)
         if request.method == 'POST':
@@ -180,7 +277,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False,
             methods=['get'],
-            permission_classes=(IsAuthenticated,)
+            permission_classes=(IsAuthenticated,),
+            throttle_classes=(ShoppingCartDownloadThrottle,)
             )
     def download_shopping_cart(self, request):
         if not request.user.shoppings_cart.exists():
@@ -198,4 +296,132 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(
                 {'errors': 'Список покупок не может быть пустым.'},
                 status=status.HTTP_204_NO_CONTENT)
+        ShoppingCartDownloadThrottle().charge(
+            request, self,
+            len(ingredients) // constants.SHOPPING_CART_COST_STEP)
         return self.create_txt_file(shopping_list, request)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk):
+        """Рецепты с похожим набором ингредиентов."""
+        recipe = get_object_or_404(Recipe, pk=pk)
+        limit = get_limit_param(
+            request, 'limit', constants.SIMILAR_RECIPES_LIMIT,
+            constants.MAX_SIMILAR_RECIPES_LIMIT)
+        similar_ids = find_similar(recipe.pk, limit)
+        recipes = Recipe.objects.in_bulk(similar_ids)
+        serializer = RecipeShortSerializer(
+            [recipes[pk] for pk in similar_ids if pk in recipes],
+            many=True, context={'request': request})
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь."""
+        recipe_ids = self.paginate_queryset(Feed(request.user))
+        return self.get_paginated_response(serialize_recipes(
+            recipe_ids, request, get_requested_fields(
+                request, RecipeReadSerializer.Meta.fields)))
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Рецепты, изменённые и удалённые после курсора since.
+
+        Id журнала выдаются до коммита, поэтому на PostgreSQL строка
+        с меньшим id может стать видна позже большей. Курсор сдвигается
+        только на записи старше CHANGES_SETTLE_SECONDS, а более свежие
+        придут ещё раз в следующем ответе; повтор безопасен.
+        Если since указывает в удалённую часть журнала, возвращается
+        reset: клиент загружает рецепты заново и продолжает с cursor.
+        """
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            return Response(
+                {'errors': 'Некорректное значение since.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        settled_before = timezone.now() - timedelta(
+            seconds=constants.CHANGES_SETTLE_SECONDS)
+        oldest = RecipeChange.objects.aggregate(oldest=Min('id'))['oldest']
+        if oldest is not None and since < oldest - 1:
+            settled = RecipeChange.objects.filter(
+                changed_at__lte=settled_before
+            ).aggregate(last=Max('id'))['last']
+            return Response({
+                'cursor': settled or oldest - 1,
+                'has_more': False,
+                'reset': True,
+                'updated': [],
+                'deleted': [],
+            })
+        changes = list(
+            RecipeChange.objects.filter(id__gt=since).values_list(
+                'id', 'recipe_id', 'action', 'changed_at'
+            )[:constants.CHANGES_PAGE_SIZE + 1]
+        )
+        page_full = len(changes) > constants.CHANGES_PAGE_SIZE
+        changes = changes[:constants.CHANGES_PAGE_SIZE]
+        cursor = max((
+            change_id for change_id, _, _, changed_at in changes
+            if changed_at <= settled_before
+        ), default=since)
+        latest = {recipe_id: action for _, recipe_id, action, _ in changes}
+        # Документы и флаги читаются пачкой: число запросов не зависит
+        # от размера страницы.
+        updated = serialize_recipes([
+            recipe_id for recipe_id, action in latest.items()
+            if action == RecipeChange.UPDATED
+        ], request)
+        return Response({
+            'cursor': cursor,
+            'has_more': page_full and cursor > since,
+            'reset': False,
+            'updated': updated,
+            'deleted': [
+                recipe_id for recipe_id, action in latest.items()
+                if action == RecipeChange.DELETED
+            ],
+        })
+
+
+class BootstrapView(APIView):
+    """Всё для первой отрисовки SPA одним ответом.
+
+    Текущий пользователь, теги, первая страница рецептов и id
+    избранного, корзины и подписок собираются фиксированным числом
+    запросов: флаги пользователя загружаются один раз и используются
+    и для списков id, и для страницы рецептов.
+    """
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        user = request.user
+        flags = get_all_user_flags(user)
+        paginator = BootstrapRecipesPaginator()
+        page = paginator.paginate_queryset(
+            Recipe.objects.values_list('pk', flat=True), request, self)
+        recipes = paginator.get_paginated_response(
+            serialize_recipes(list(page), request, flags=flags)).data
+        favorites, shopping_cart, subscriptions = flags or ((), (), ())
+        return Response({
+            'user': {
+                **{field: getattr(user, field) for field in AUTHOR_FIELDS},
+                'is_subscribed': user.pk in subscriptions,
+            } if user.is_authenticated else None,
+            'tags': list(get_tags_by_id().values()),
+            'recipes': recipes,
+            'favorites': sorted(favorites),
+            'shopping_cart': sorted(shopping_cart),
+            'subscriptions': sorted(subscriptions),
+        })
+
+
+class MetricsView(APIView):
+    """Гистограммы времени в очереди для Prometheus."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            histogram.export(), content_type='text/plain; version=0.0.4')
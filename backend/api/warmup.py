@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.test import RequestFactory
+from django.urls import resolve
+from django.utils import translation
+
+from recipes.models import Recipe
+from .filters import RecipeFilter
+from .serializers import (
+    FollowListSerializer, IngredientSerializer, RecipeReadSerializer,
+    RecipeShortSerializer, RecipeWriteSerializer, TagSerializer,
+    UserReadSerializer)
+
+
+WARMUP_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/1/',
+    '/api/recipes/download_shopping_cart/',
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/users/',
+    '/api/users/me/',
+    '/api/users/subscriptions/',
+)
+CATALOGUE_PATHS = ('/api/tags/', '/api/ingredients/')
+SERIALIZERS = (
+    RecipeReadSerializer, RecipeWriteSerializer, RecipeShortSerializer,
+    FollowListSerializer, UserReadSerializer, TagSerializer,
+    IngredientSerializer,
+)
+
+
+def warm_urls():
+    """Компиляция регулярных выражений резолвера и роутера DRF."""
+    for path in WARMUP_PATHS:
+        resolve(path)
+
+
+def warm_translations():
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Invalid token.')
+
+
+def warm_serializers():
+    """Построение полей сериализаторов и кешей _meta моделей."""
+    for serializer_class in SERIALIZERS:
+        serializer_class(context={}).fields
+
+
+def warm_filters():
+    RecipeFilter(data={}, queryset=Recipe.objects.none()).form
+
+
+def prime_caches():
+    """Заполнение кеша справочников до первого запроса клиента."""
+    factory = RequestFactory()
+    try:
+        for path in CATALOGUE_PATHS:
+            request = factory.get(path, HTTP_ACCEPT='application/json')
+            resolve(path).func(request)
+    finally:
+        close_old_connections()
+
+
+IN_MEMORY_PHASES = (
+    ('urls', warm_urls),
+    ('translations', warm_translations),
+    ('serializers', warm_serializers),
+    ('filters', warm_filters),
+)
+
+
+def warmup(prime=True):
+    """Прогрев воркера. Возвращает длительность каждой фазы в секундах."""
+    phases = IN_MEMORY_PHASES + ((('caches', prime_caches),) if prime else ())
+    timings = {}
+    for name, phase in phases:
+        started = time.perf_counter()
+        phase()
+        timings[name] = time.perf_counter() - started
+    return timings
@@ -11,3 +11,44 @@ MAX_LENGTH_LAST_NAME = 150
 MIN_AMOUNT = 1
 MAX_AMOUNT = 100
 MAX_LENGTH_PASSWORD = 150
+MAX_PAGE_SIZE = 100
+MAX_RECIPES_LIMIT = 50
+SHOPPING_CART_COST_STEP = 10
+SUBSCRIPTIONS_COST_STEP = 100
+MIN_INGREDIENT_SEARCH_LENGTH = 2
+SHORT_INGREDIENT_SEARCH_COST = 5
+THROTTLE_WINDOW_SLOTS = 10
+MAX_LENGTH_CHANGE_ACTION = 7
+CHANGES_PAGE_SIZE = 500
+CHANGES_SETTLE_SECONDS = 30
+CHANGES_RETENTION_DAYS = 30
+PRUNE_INTERVAL = 60 * 60
+SLOW_QUERY_RETENTION_DAYS = 7
+OUTBOX_SKIPPED_RETENTION_DAYS = 7
+FEED_FANOUT_BATCH = 1000
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_BACKFILL_SIZE = 100
+FEED_PULL_AUTHORS_TIMEOUT = 60 * 60
+FEED_PULL_AUTHORS_REFRESH = 10 * 60
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+MINHASH_SEED = 23
+SIMILAR_RECIPES_LIMIT = 6
+MAX_SIMILAR_RECIPES_LIMIT = 50
+SUGGESTIONS_TOP_K = 20
+SUGGESTIONS_FAVORITE_WEIGHT = 0.5
+SUGGESTIONS_BLOCK_SIZE = 1000
+SUGGESTIONS_BATCH_SIZE = 5000
+MAX_LENGTH_JOB_STATUS = 7
+DELETION_JOB_STALE_SECONDS = 10 * 60
+DELETION_JOBS_INTERVAL = 10
+BULK_DELETE_BATCH_SIZE = 500
+BULK_DELETE_ASYNC_THRESHOLD = 200
+MAX_USER_SEARCH_RESULTS = 50
+TRANSFER_BATCH_SIZE = 500
+TRANSFER_IMAGE_WORKERS = 8
+DOCUMENTS_BATCH_SIZE = 500
+MEDIA_GC_BATCH_SIZE = 500
+MEDIA_GC_GRACE_HOURS = 24
+QUEUE_TIME_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
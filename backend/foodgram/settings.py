@@ -35,11 +35,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.shedding.LoadSheddingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.profiling.SlowQueryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,12 +87,76 @@ else:
         }
     }
 
+# LocMemCache — только для разработки: у каждого процесса свой кеш,
+# и версии каталога, флагов пользователя и токены не видны другим
+# воркерам и outbox. В docker-compose кеш общий (memcached).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+COMPRESSION_MIN_LENGTH = int(os.getenv('COMPRESSION_MIN_LENGTH', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+# Сжимаются только ответы API. HTML админки и browsable API с токеном
+# CSRF сжатию не подлежит: иначе возможна атака BREACH.
+COMPRESSION_CONTENT_TYPES = ('application/json', 'text/plain')
+CATALOGUE_CACHE_TIMEOUT = int(os.getenv('CATALOGUE_CACHE_TIMEOUT', 60 * 60))
+
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 60))
+
+# Обработка событий outbox сразу после коммита, без воркера run_outbox.
+OUTBOX_EAGER = os.getenv('OUTBOX_EAGER', '') == 'True'
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 0.5))
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_RETRY_DELAY = 1
+OUTBOX_MAX_RETRY_DELAY = 10 * 60
+
+PAGINATION_COUNT_TIMEOUT = int(os.getenv('PAGINATION_COUNT_TIMEOUT', 30))
+PAGINATION_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 100000))
+
+RECIPE_FAST_READ = os.getenv('RECIPE_FAST_READ', 'True') == 'True'
+# Документы поддерживаются всегда; флаг переключает только чтение.
+RECIPE_DOCUMENTS = os.getenv('RECIPE_DOCUMENTS', 'True') == 'True'
+
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MAX_QUERIES = 1000
+PROFILING_STACK_DEPTH = 5
+PROFILING_SUMMARY_LINES = 60
+# 0 — медленные запросы не записываются.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 0))
+SLOW_QUERY_MAX_PER_REQUEST = 20
+SLOW_QUERY_EXPLAIN_INTERVAL = 60 * 60
+
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 24 * 60 * 60))
+IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', 5))
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Допустимое ожидание в очереди до воркера, секунды.
+LOAD_SHEDDING_BUDGETS = {
+    'download': float(os.getenv('LOAD_SHEDDING_DOWNLOAD_BUDGET', 1)),
+    'write': float(os.getenv('LOAD_SHEDDING_WRITE_BUDGET', 2)),
+    'default': float(os.getenv('LOAD_SHEDDING_DEFAULT_BUDGET', 5)),
+    'catalogue': float(os.getenv('LOAD_SHEDDING_CATALOGUE_BUDGET', 10)),
+}
+LOAD_SHEDDING_RETRY_AFTER = 2
+QUEUE_TIME_FLUSH_INTERVAL = 10
+
+WARMUP_ON_READY = os.getenv('WARMUP_ON_READY', '') == 'True'
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -96,8 +164,17 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': [
         'api.pagination.LimitPaginator',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'download_shopping_cart': os.getenv(
+            'THROTTLE_DOWNLOAD_SHOPPING_CART', '10/min'),
+        'subscriptions': os.getenv('THROTTLE_SUBSCRIPTIONS', '60/min'),
+        'ingredients': os.getenv('THROTTLE_INGREDIENTS', '120/min'),
+    },
     'PAGE_SIZE': 6,
     'SEARCH_PARAM': 'name',
+    # nginx дописывает адрес клиента в X-Forwarded-For; адреса левее
+    # прислал сам клиент, и для троттлинга им верить нельзя.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
 
 DJOSER = {
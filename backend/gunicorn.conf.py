@@ -0,0 +1,25 @@
+import os
+
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', 3))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Держим соединения дольше, чем keepalive_timeout в nginx,
+# чтобы upstream-пул не натыкался на закрытые сокеты.
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+# С preload_app приложение и прогрев в памяти выполняются один раз
+# в мастере, а воркеры получают готовые структуры через fork.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+raw_env = ['WARMUP_ON_READY=True']
+
+
+def post_worker_init(worker):
+    from api.warmup import warmup
+
+    timings = warmup()
+    worker.log.info(
+        'Worker warmed up in %.1f ms: %s',
+        sum(timings.values()) * 1000,
+        ', '.join(f'{name}={seconds * 1000:.1f}ms'
+                  for name, seconds in timings.items()))
@@ -1,14 +1,35 @@
 from django.contrib import admin
+from django.contrib.admin import helpers
 from django.contrib.auth.models import Group
+from django.template.response import TemplateResponse
 from rest_framework.authtoken.models import TokenProxy
 
+from api.outbox import publish
 from . import models
+from .deletion import delete_recipes, deletion_summary
+from .signals import touch_recipes
 
 
 class IngredientAmountAdmin(admin.ModelAdmin):
     list_display = ('pk', 'recipe', 'ingredient', 'amount')
     list_editable = ('recipe', 'ingredient', 'amount')
 
+    # У IngredientAmount нет сигналов, чтобы удаление шло быстрым
+    # путём; рецепты обновляются явно, одним запросом на действие.
+    def save_model(self, request, obj, form, change):
+        old_recipe_id = form.initial.get('recipe')
+        super().save_model(request, obj, form, change)
+        touch_recipes(pk__in={obj.recipe_id, old_recipe_id} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        touch_recipes(pk=obj.recipe_id)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        touch_recipes(pk__in=recipe_ids)
+
 
 class RecipeTagInline(admin.TabularInline):
     model = models.Recipe.tags.through
@@ -20,7 +41,33 @@ class RecipeIngredientInline(admin.TabularInline):
     min_num = 1
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class FastDeleteMixin:
+    """Действие быстрого удаления со своей страницей подтверждения.
+
+    Стандартная страница собирает все связанные объекты через
+    Collector, что и приводит к таймаутам; здесь показываются только
+    количества строк по связям.
+    """
+
+    @admin.action(description='Быстро удалить выбранные объекты')
+    def fast_delete(self, request, queryset):
+        if request.POST.get('post'):
+            self.delete_queryset(request, queryset)
+            self.message_user(request, 'Удаление выполнено.')
+            return None
+        opts = self.model._meta
+        return TemplateResponse(request, 'admin/fast_delete.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Вы уверены?',
+            'opts': opts,
+            'summary': deletion_summary(queryset),
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+
+class RecipeAdmin(FastDeleteMixin, admin.ModelAdmin):
     exclude = ('is_favorited', 'is_in_shopping_cart')
     list_display = (
         'pk', 'name', 'author', 'cooking_time',
@@ -31,6 +78,7 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     list_filter = ('name', 'author', 'tags')
     empty_value_display = '???'
+    actions = ('fast_delete',)
     inines = [
         RecipeIngredientInline,
         RecipeTagInline,
@@ -40,6 +88,19 @@ class RecipeAdmin(admin.ModelAdmin):
     def is_favorited(self, obj):
         return obj.favorite_recipes.count()
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recipe_id = form.instance.pk
+        if not change:
+            publish('recipe.created', recipe_id)
+        publish('recipe.saved', recipe_id)
+
+    def delete_model(self, request, obj):
+        delete_recipes(models.Recipe.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_recipes(queryset)
+
 
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'recipe')
@@ -57,6 +118,19 @@ class TagAdmin(admin.ModelAdmin):
     empty_value_display = '???'
 
 
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'user_id', 'status', 'deleted_recipes', 'total_recipes',
+        'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = (
+        'user_id', 'status', 'deleted_recipes', 'total_recipes',
+        'error', 'created_at', 'updated_at', 'finished_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'measurement_unit')
     list_filter = ('name', )
@@ -69,5 +143,6 @@ admin.site.register(models.Tag, TagAdmin)
 admin.site.register(models.Favorite, FavoriteAdmin)
 admin.site.register(models.ShoppingCart, ShoppingCartAdmin)
 admin.site.register(models.IngredientAmount, IngredientAmountAdmin)
+admin.site.register(models.DeletionJob, DeletionJobAdmin)
 admin.site.unregister(Group)
 admin.site.unregister(TokenProxy)
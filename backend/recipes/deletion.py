@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from foodgram import constants
+from users.models import User
+from .models import DeletionJob, Recipe
+from .utils import iter_pk_batches
+
+
+def reverse_relations(model):
+    return [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete
+        and (field.one_to_many or field.one_to_one)
+    ]
+
+
+def remove_files(names):
+    # Импорт хранит одинаковые картинки одним файлом на несколько
+    # рецептов, поэтому удаляются только файлы без ссылок.
+    names = set(filter(None, names)) - set(Recipe.objects.filter(
+        image__in=names).values_list('image', flat=True))
+    for name in names:
+        default_storage.delete(name)
+
+
+def delete_recipe_batch(pks):
+    """Удаление пачки рецептов с зависимыми строками и картинками.
+
+    Удаление идёт через ORM: журнал изменений, версии флагов и
+    количеств обновляют обработчики сигналов, как при удалении одного
+    рецепта. Пачка ограничивает число объектов, которые Collector
+    держит в памяти.
+    """
+    with transaction.atomic():
+        images = list(Recipe.objects.filter(
+            pk__in=pks).values_list('image', flat=True))
+        Recipe.objects.filter(pk__in=pks).delete()
+        transaction.on_commit(lambda: remove_files(images))
+
+
+def delete_recipes(queryset, progress=None):
+    """Пакетное удаление рецептов; progress(n) вызывается после пачки."""
+    deleted = 0
+    for pks in iter_pk_batches(queryset):
+        delete_recipe_batch(pks)
+        deleted += len(pks)
+        if progress is not None:
+            progress(deleted)
+    return deleted
+
+
+def delete_user(user_id, progress=None):
+    """Удаление пользователя: сначала рецепты пачками, затем аккаунт.
+
+    Токены, подписки и флаги подписчиков сбрасывают сигналы удаляемых
+    вместе с аккаунтом строк.
+    """
+    delete_recipes(Recipe.objects.filter(author_id=user_id), progress)
+    User.objects.filter(pk=user_id).delete()
+
+
+def claim_job(job_id, stale_before=None):
+    """Перевод задачи в RUNNING; False, если её уже выполняет другой.
+
+    Задача в RUNNING, которая не обновлялась с stale_before, считается
+    брошенной: её воркер завершился, не дойдя до конца.
+    """
+    claimable = Q(status=DeletionJob.PENDING)
+    if stale_before is not None:
+        claimable |= Q(
+            status=DeletionJob.RUNNING, updated_at__lt=stale_before)
+    return DeletionJob.objects.filter(claimable, pk=job_id).update(
+        status=DeletionJob.RUNNING, updated_at=timezone.now()) == 1
+
+
+def run_job(job_id, stale_before=None):
+    if not claim_job(job_id, stale_before):
+        return False
+    job = DeletionJob.objects.get(pk=job_id)
+
+    def progress(deleted):
+        DeletionJob.objects.filter(pk=job_id).update(
+            deleted_recipes=job.deleted_recipes + deleted,
+            updated_at=timezone.now())
+
+    try:
+        delete_user(job.user_id, progress)
+    except Exception as error:
+        DeletionJob.objects.filter(pk=job_id).update(
+            status=DeletionJob.FAILED, error=str(error),
+            updated_at=timezone.now(), finished_at=timezone.now())
+        raise
+    DeletionJob.objects.filter(pk=job_id).update(
+        status=DeletionJob.DONE, updated_at=timezone.now(),
+        finished_at=timezone.now())
+    return True
+
+
+def run_pending_jobs():
+    """Выполнение задач удаления в воркере run_outbox.
+
+    Задачи выполняются вне транзакции обработки событий: прогресс
+    фиксируется после каждой пачки. Подбираются новые задачи и задачи
+    в RUNNING без обновлений дольше DELETION_JOB_STALE_SECONDS: их
+    воркер завершился, не дойдя до конца.
+    """
+    stale_before = timezone.now() - timedelta(
+        seconds=constants.DELETION_JOB_STALE_SECONDS)
+    jobs = list(DeletionJob.objects.filter(
+        Q(status=DeletionJob.PENDING)
+        | Q(status=DeletionJob.RUNNING, updated_at__lt=stale_before)
+    ).order_by('pk').values_list('pk', flat=True))
+    return [job_id for job_id in jobs if run_job(job_id, stale_before)]
+
+
+def deletion_summary(queryset):
+    """Что удалит быстрое удаление: число строк на уровень вниз.
+
+    Считается по одному COUNT на связь, без обхода Collector, поэтому
+    страница подтверждения не зависит от объёма данных.
+    """
+    model = queryset.model
+    pks = queryset.order_by().values('pk')
+    summary = [(model._meta.verbose_name_plural, queryset.count())]
+    for relation in reverse_relations(model):
+        if relation.on_delete is not models.CASCADE:
+            continue
+        related_model = relation.related_model
+        count = related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': pks}).count()
+        if count:
+            summary.append((related_model._meta.verbose_name_plural, count))
+    return summary
+
+
+def delete_user_account(user):
+    """Удаляет аккаунт сразу или, если рецептов много, задачей в воркере.
+
+    Перед фоновым удалением аккаунт деактивируется, чтобы им нельзя
+    было воспользоваться, пока задача ждёт воркер или выполняется.
+    """
+    total = Recipe.objects.filter(author_id=user.pk).count()
+    if total <= constants.BULK_DELETE_ASYNC_THRESHOLD:
+        delete_user(user.pk)
+        return None
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+    job = DeletionJob.objects.create(user_id=user.pk, total_recipes=total)
+    if settings.OUTBOX_EAGER:
+        # Без воркера задача выполняется после коммита в этом процессе.
+        transaction.on_commit(lambda: run_job(job.pk))
+    return job
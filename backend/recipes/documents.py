@@ -0,0 +1,49 @@
+import threading
+
+from django.db import transaction
+
+from api.fast_read import build_documents
+from foodgram import constants
+from .models import RecipeDocument
+from .utils import iter_chunks
+
+# Соединения с БД у каждого потока свои, как и накопленные id.
+pending = threading.local()
+
+
+def rebuild_documents(recipe_ids):
+    """Пересборка документов рецептов пачками в текущей транзакции."""
+    for chunk in iter_chunks(recipe_ids, constants.DOCUMENTS_BATCH_SIZE):
+        documents = build_documents(chunk)
+        with transaction.atomic():
+            RecipeDocument.objects.filter(recipe_id__in=chunk).delete()
+            RecipeDocument.objects.bulk_create(
+                RecipeDocument(recipe_id=recipe_id, document=document)
+                for recipe_id, document in documents.items()
+            )
+
+
+def rebuild_pending_documents():
+    recipe_ids = getattr(pending, 'recipe_ids', set())
+    pending.recipe_ids = set()
+    if recipe_ids:
+        rebuild_documents(sorted(recipe_ids))
+
+
+def schedule_rebuild(recipe_ids):
+    """Пересборка документов после коммита, по разу на рецепт.
+
+    Сигналы одного запроса вызывают её многократно (сохранение рецепта,
+    теги, ингредиенты), а собираются документы один раз: первый
+    обработчик после коммита забирает все накопленные id, остальные
+    ничего не делают. Старые документы удаляются сразу: до пересборки
+    чтение соберёт их на лету и не увидит устаревшие данные под новым
+    updated_at. Id из откатившейся транзакции пересоберутся со
+    следующим коммитом потока, это безопасно.
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    RecipeDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+    pending.recipe_ids = getattr(pending, 'recipe_ids', set()) | recipe_ids
+    transaction.on_commit(rebuild_pending_documents)
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from api.outbox import handler, periodic
+from foodgram import constants
+from users.models import Follow
+from .deletion import run_pending_jobs
+from .feed import (
+    backfill_feed, fan_out_recipe, prune_feed, refresh_pull_authors)
+from .models import RecipeChange
+from .similarity import update_recipe_index
+from .utils import delete_older_than
+
+
+@handler('recipe.created')
+def on_recipe_created(key, payload):
+    fan_out_recipe(int(key))
+
+
+@handler('recipe.saved')
+def on_recipe_saved(key, payload):
+    update_recipe_index(int(key))
+
+
+@handler('follow.created')
+def on_follow_created(key, payload):
+    # За время ожидания в очереди подписку могли отменить.
+    user_id, author_id = payload['user_id'], payload['author_id']
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill_feed(user_id, author_id)
+    else:
+        prune_feed(user_id, author_id)
+
+
+@periodic(constants.PRUNE_INTERVAL)
+def prune_recipe_changes():
+    # Последняя запись остаётся всегда: по младшей сохранённой записи
+    # changes распознаёт курсоры, которые указывают в удалённую часть.
+    latest = RecipeChange.objects.aggregate(latest=Max('id'))['latest']
+    delete_older_than(
+        RecipeChange.objects.exclude(pk=latest), 'changed_at',
+        timezone.now() - timedelta(days=constants.CHANGES_RETENTION_DAYS))
+
+
+@periodic(constants.FEED_PULL_AUTHORS_REFRESH)
+def refresh_feed_pull_authors():
+    refresh_pull_authors()
+
+
+@periodic(constants.DELETION_JOBS_INTERVAL)
+def run_deletion_jobs():
+    run_pending_jobs()
@@ -0,0 +1,121 @@
+import heapq
+from itertools import islice
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from foodgram import constants
+from users.models import Follow
+from .models import FeedEntry, Recipe
+
+PULL_AUTHORS_KEY = 'feed:pull_authors'
+
+
+def refresh_pull_authors():
+    """Пересчитывает авторов, чьи рецепты не раскладываются по лентам."""
+    authors = frozenset(Follow.objects.values('author').annotate(
+        followers=Count('pk')
+    ).filter(
+        followers__gt=constants.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('author', flat=True))
+    cache.set(
+        PULL_AUTHORS_KEY, authors, constants.FEED_PULL_AUTHORS_TIMEOUT)
+    return authors
+
+
+def get_pull_authors():
+    """Авторы с огромным числом подписчиков читаются в ленту на лету.
+
+    Множество считается одним GROUP BY по Follow и хранится в кеше;
+    run_outbox пересчитывает его по расписанию.
+    """
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        authors = refresh_pull_authors()
+    return authors
+
+
+def is_pull_author(author_id):
+    return author_id in get_pull_authors()
+
+
+def fan_out_recipe(recipe_id):
+    """Раскладывает рецепт по лентам подписчиков автора пачками."""
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'author_id', 'pub_date').first()
+    if recipe is None or is_pull_author(recipe['author_id']):
+        return
+    followers = Follow.objects.filter(
+        author_id=recipe['author_id']
+    ).values_list('user_id', flat=True).order_by('pk').iterator()
+    batch = []
+    for user_id in followers:
+        batch.append(FeedEntry(
+            user_id=user_id, recipe_id=recipe_id,
+            author_id=recipe['author_id'], pub_date=recipe['pub_date']))
+        if len(batch) >= constants.FEED_FANOUT_BATCH:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора при подписке."""
+    if is_pull_author(author_id):
+        return
+    recipes = Recipe.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')[:constants.FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id,
+                author_id=author_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True
+    )
+
+
+def prune_feed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+class Feed:
+    """Лента подписок для Paginator: count() и срезы.
+
+    Срез читает записи ленты пользователя по индексу (user, -pub_date)
+    и сливает их по дате с рецептами авторов, читаемых на лету; таких
+    подписок у пользователя единицы. Элементы среза — id рецептов,
+    документы для них читает serialize_recipes.
+    """
+
+    def __init__(self, user):
+        pull_authors = get_pull_authors()
+        self.pull_authors = list(Follow.objects.filter(
+            user=user, author_id__in=pull_authors
+        ).values_list('author_id', flat=True)) if pull_authors else []
+        # Записи авторов, ставших читаемыми на лету, уже в pulled.
+        self.entries = FeedEntry.objects.filter(user=user).exclude(
+            author_id__in=self.pull_authors
+        ).order_by('-pub_date', '-recipe_id')
+        self.pulled = Recipe.objects.filter(
+            author_id__in=self.pull_authors
+        ).order_by('-pub_date', '-pk')
+
+    def count(self):
+        count = self.entries.count()
+        if self.pull_authors:
+            count += self.pulled.count()
+        return count
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        rows = [self.entries.values_list('pub_date', 'recipe_id')[:stop]]
+        if self.pull_authors:
+            rows.append(self.pulled.values_list('pub_date', 'pk')[:stop])
+        return [
+            recipe_id for _, recipe_id in islice(
+                heapq.merge(*rows, reverse=True), start, stop)
+        ]
@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from foodgram import constants
+from recipes.documents import rebuild_documents
+from recipes.models import Recipe
+from recipes.utils import iter_pk_batches
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает документы рецептов для быстрого чтения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=constants.DOCUMENTS_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = 0
+        for pks in iter_pk_batches(
+            Recipe.objects.all(), options['batch_size']
+        ):
+            rebuild_documents(pks)
+            total += len(pks)
+            self.stdout.write(f'Собрано документов: {total}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {total} документов.'))
@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management import BaseCommand
+
+from recipes.minhash import index_chunk
+from recipes.similarity import (
+    delete_stale_entries, iter_ingredient_sets, save_entries)
+from recipes.utils import iter_chunks
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает MinHash/LSH-индекс похожих рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        chunks = iter_chunks(iter_ingredient_sets(), options['chunk_size'])
+        total = 0
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            # Держим в работе не больше двух пачек на процесс,
+            # чтобы не читать всю таблицу в память.
+            pending = []
+            for chunk in chunks:
+                pending.append(pool.submit(index_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    entries = pending.pop(0).result()
+                    save_entries(entries)
+                    total += len(entries)
+            for future in pending:
+                entries = future.result()
+                save_entries(entries)
+                total += len(entries)
+        stale = delete_stale_entries()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {total}, '
+            f'удалено устаревших сигнатур: {stale}.'))
@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand
+
+from foodgram import constants
+from recipes.models import Recipe
+from recipes.transfer import (
+    IMAGES_DIR, RECIPES_FILE, dump_record, export_batch, read_state,
+    write_state)
+from recipes.utils import iter_pk_batches
+
+STATE_FILE = '.export-state.json'
+
+
+class Command(BaseCommand):
+    help = ('Выгружает рецепты в JSON Lines, изображения — отдельными '
+            'файлами с именами по sha256. Прерванная выгрузка '
+            'продолжается с последней записанной пачки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.TRANSFER_BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=constants.TRANSFER_IMAGE_WORKERS)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать выгрузку заново, игнорируя сохранённое состояние.')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(os.path.join(directory, IMAGES_DIR), exist_ok=True)
+        state_path = os.path.join(directory, STATE_FILE)
+        state = None if options['restart'] else read_state(state_path)
+        state = state or {'last_pk': 0, 'offset': 0, 'exported': 0}
+        recipes = Recipe.objects.filter(pk__gt=state['last_pk'])
+        mode = 'r+b' if state['offset'] else 'wb'
+        with open(os.path.join(directory, RECIPES_FILE), mode) as output, \
+                ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            # Хвост недописанной пачки отбрасывается.
+            output.truncate(state['offset'])
+            output.seek(state['offset'])
+            for pks in iter_pk_batches(recipes, options['batch_size']):
+                for record in export_batch(pks, directory, pool):
+                    output.write(dump_record(record))
+                output.flush()
+                os.fsync(output.fileno())
+                state = {
+                    'last_pk': pks[-1],
+                    'offset': output.tell(),
+                    'exported': state['exported'] + len(pks),
+                }
+                write_state(state_path, state)
+                self.stdout.write(f'Выгружено рецептов: {state["exported"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка завершена: {state["exported"]} рецептов.'))
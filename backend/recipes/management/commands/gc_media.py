@@ -0,0 +1,98 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from foodgram import constants
+from recipes.models import Recipe
+from recipes.utils import iter_chunks
+
+
+def iter_files(path):
+    """Файлы дерева каталогов без построения полного списка."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+class RateLimiter:
+    """Не больше rate операций в секунду; 0 — без ограничения."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из MEDIA_ROOT картинки, на которые не ссылается '
+            'ни один рецепт и которые старше периода ожидания.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, которые будут удалены.')
+        parser.add_argument(
+            '--grace-hours', type=float,
+            default=constants.MEDIA_GC_GRACE_HOURS,
+            help='Не трогать файлы моложе этого срока: они могут '
+                 'принадлежать ещё не закоммиченным рецептам.')
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.MEDIA_GC_BATCH_SIZE)
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Максимум удалений в секунду.')
+
+    def handle(self, *args, **options):
+        upload_to = Recipe._meta.get_field('image').upload_to
+        root = os.path.join(settings.MEDIA_ROOT, upload_to)
+        if not os.path.isdir(root):
+            raise CommandError(f'Каталог {root} не найден.')
+        deadline = time.time() - options['grace_hours'] * 60 * 60
+        limiter = RateLimiter(options['rate'])
+        candidates = (
+            entry for entry in iter_files(root)
+            if entry.stat(follow_symlinks=False).st_mtime < deadline
+        )
+        scanned = removed = freed = 0
+        for batch in iter_chunks(candidates, options['batch_size']):
+            scanned += len(batch)
+            names = {
+                os.path.relpath(entry.path, settings.MEDIA_ROOT).replace(
+                    os.sep, '/'): entry
+                for entry in batch
+            }
+            # Ссылки проверяются прямо перед удалением пачки.
+            referenced = set(Recipe.objects.filter(
+                image__in=names).values_list('image', flat=True))
+            for name, entry in names.items():
+                if name in referenced:
+                    continue
+                size = entry.stat(follow_symlinks=False).st_size
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    limiter.wait()
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        continue
+                removed += 1
+                freed += size
+            self.stdout.write(
+                f'Проверено: {scanned}, без ссылок: {removed}, '
+                f'{freed / 1024 / 1024:.1f} МБ')
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов: {removed}, {freed / 1024 / 1024:.1f} МБ.'))
@@ -0,0 +1,60 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand
+
+from foodgram import constants
+from recipes.transfer import (
+    RECIPES_FILE, import_batch, read_state, write_state)
+
+STATE_FILE = '.import-state.json'
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты, выгруженные export_recipes. Прерванная '
+            'загрузка продолжается с последней сохранённой пачки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.TRANSFER_BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=constants.TRANSFER_IMAGE_WORKERS)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать загрузку с начала файла.')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        state_path = os.path.join(directory, STATE_FILE)
+        state = None if options['restart'] else read_state(state_path)
+        state = state or {'offset': 0, 'read': 0, 'imported': 0}
+        with open(os.path.join(directory, RECIPES_FILE), 'rb') as source, \
+                ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            source.seek(state['offset'])
+            batch = []
+            # Построчное чтение: readline сохраняет корректный tell().
+            for line in iter(source.readline, b''):
+                batch.append(json.loads(line))
+                if len(batch) >= options['batch_size']:
+                    state = self.flush(batch, directory, pool, state, source)
+                    write_state(state_path, state)
+                    batch = []
+            if batch:
+                state = self.flush(batch, directory, pool, state, source)
+                write_state(state_path, state)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка завершена: прочитано {state["read"]}, '
+            f'создано {state["imported"]} рецептов.'))
+
+    def flush(self, batch, directory, pool, state, source):
+        imported = import_batch(batch, directory, pool)
+        state = {
+            'offset': source.tell(),
+            'read': state['read'] + len(batch),
+            'imported': state['imported'] + imported,
+        }
+        self.stdout.write(
+            f'Прочитано: {state["read"]}, создано: {state["imported"]}')
+        return state
@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from recipes.deletion import run_job
+from recipes.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = 'Выполняет незавершённые задачи удаления аккаунтов.'
+
+    def handle(self, *args, **options):
+        jobs = DeletionJob.objects.filter(
+            status__in=(DeletionJob.PENDING, DeletionJob.RUNNING)
+        ).order_by('pk').values_list('pk', flat=True)
+        # Задачи в RUNNING тоже подбираются: команду запускают вручную,
+        # когда воркер, который их выполнял, уже остановлен.
+        stale_before = timezone.now()
+        for job_id in jobs:
+            if run_job(job_id, stale_before):
+                self.stdout.write(f'Задача {job_id} выполнена.')
+            else:
+                self.stdout.write(f'Задачу {job_id} выполняет другой воркер.')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,51 @@
+# Модуль не зависит от Django: он импортируется в дочерних процессах
+# пула при пересборке индекса похожих рецептов.
+import hashlib
+
+import numpy as np
+
+from foodgram import constants
+
+
+PRIME = np.uint64((1 << 31) - 1)
+ROWS_PER_BAND = constants.MINHASH_PERMUTATIONS // constants.MINHASH_BANDS
+
+_rng = np.random.default_rng(constants.MINHASH_SEED)
+COEFF_A = _rng.integers(
+    1, PRIME, constants.MINHASH_PERMUTATIONS, dtype=np.uint64)
+COEFF_B = _rng.integers(
+    0, PRIME, constants.MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def compute_signature(ingredient_ids):
+    """MinHash-сигнатура: минимум каждой хеш-функции по ингредиентам."""
+    values = np.asarray(ingredient_ids, dtype=np.uint64) % PRIME
+    hashes = (COEFF_A[:, None] * values[None, :] + COEFF_B[:, None]) % PRIME
+    return hashes.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature):
+    """Хеши полос сигнатуры для LSH-индекса."""
+    bands = signature.reshape(constants.MINHASH_BANDS, ROWS_PER_BAND)
+    return [
+        int.from_bytes(
+            hashlib.blake2b(band.tobytes(), digest_size=8).digest(),
+            'big', signed=True)
+        for band in bands
+    ]
+
+
+def index_entry(recipe_id, ingredient_ids):
+    """Сигнатура и корзины одного рецепта; без обращений к БД.
+
+    У рецепта без ингредиентов сигнатуры нет: одинаковые пустые
+    сигнатуры сделали бы все такие рецепты похожими друг на друга.
+    """
+    if not ingredient_ids:
+        return recipe_id, None, []
+    signature = compute_signature(ingredient_ids)
+    return recipe_id, signature.tobytes(), band_buckets(signature)
+
+
+def index_chunk(chunk):
+    return [index_entry(recipe_id, ids) for recipe_id, ids in chunk]
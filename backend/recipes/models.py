@@ -47,6 +47,8 @@ class Recipe(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='recipes')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True)
     cooking_time = models.PositiveSmallIntegerField(
         validators=[
             MinValueValidator(
@@ -160,3 +162,161 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил в корзину {self.recipe}'
+
+
+class RecipeChange(models.Model):
+    """Журнал изменений рецептов для инкрементальной синхронизации.
+
+    Первичный ключ служит монотонным курсором.
+    """
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (UPDATED, 'Изменён'),
+        (DELETED, 'Удалён'),
+    )
+    recipe_id = models.BigIntegerField('ID рецепта', db_index=True)
+    action = models.CharField(
+        'Действие', max_length=constants.MAX_LENGTH_CHANGE_ACTION,
+        choices=ACTIONS)
+    changed_at = models.DateTimeField('Дата изменения', auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Изменения рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.action}'
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок пользователя (fan-out on write)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'], name='feed_user_date_idx'),
+            models.Index(
+                fields=['user', 'author'], name='feed_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class RecipeSignature(models.Model):
+    """MinHash-сигнатура набора ингредиентов рецепта."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+    )
+    signature = models.BinaryField()
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return f'Сигнатура {self.recipe_id}'
+
+
+class RecipeBucket(models.Model):
+    """LSH-корзина: рецепты с совпадающей полосой сигнатуры."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='buckets',
+    )
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = 'LSH-корзина'
+        verbose_name_plural = 'LSH-корзины'
+        indexes = [
+            models.Index(
+                fields=['band', 'bucket'], name='recipe_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.band}/{self.bucket}'
+
+
+class RecipeDocument(models.Model):
+    """Готовое представление рецепта без пользовательских флагов."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document',
+    )
+    document = models.JSONField()
+
+    class Meta:
+        verbose_name = 'Документ рецепта'
+        verbose_name_plural = 'Документы рецептов'
+
+    def __str__(self):
+        return f'Документ {self.recipe_id}'
+
+
+class DeletionJob(models.Model):
+    """Фоновое удаление аккаунта с большим количеством рецептов."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершено'),
+        (FAILED, 'Ошибка'),
+    )
+    user_id = models.BigIntegerField('ID пользователя', db_index=True)
+    status = models.CharField(
+        'Статус', max_length=constants.MAX_LENGTH_JOB_STATUS,
+        choices=STATUSES, default=PENDING)
+    total_recipes = models.PositiveIntegerField('Всего рецептов', default=0)
+    deleted_recipes = models.PositiveIntegerField(
+        'Удалено рецептов', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Удаление аккаунта'
+        verbose_name_plural = 'Удаление аккаунтов'
+
+    def __str__(self):
+        return (f'Пользователь {self.user_id}: '
+                f'{self.deleted_recipes}/{self.total_recipes}')
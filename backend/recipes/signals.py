@@ -0,0 +1,117 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.cache import bump_catalogue_version, bump_count_version
+from api.conditional import bump_flags_version
+from users.models import User
+from .documents import schedule_rebuild
+from .models import (
+    Favorite, Ingredient, Recipe, RecipeChange, ShoppingCart, Tag)
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def log_changes(recipe_ids, action=RecipeChange.UPDATED):
+    RecipeChange.objects.bulk_create(
+        RecipeChange(recipe_id=recipe_id, action=action)
+        for recipe_id in recipe_ids
+    )
+    bump_count_version(Recipe)
+    if action == RecipeChange.UPDATED:
+        schedule_rebuild(recipe_ids)
+
+
+def touch_recipes(**lookup):
+    """Обновление updated_at у рецептов без их загрузки."""
+    recipe_ids = list(
+        Recipe.objects.filter(**lookup).values_list('pk', flat=True))
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now())
+        log_changes(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def log_recipe_save(sender, instance, **kwargs):
+    log_changes([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def log_recipe_delete(sender, instance, **kwargs):
+    log_changes([instance.pk], RecipeChange.DELETED)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def reset_tags_cache(sender, **kwargs):
+    bump_catalogue_version('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def reset_ingredients_cache(sender, **kwargs):
+    bump_catalogue_version('ingredients')
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(ingredients=instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_author_fields(sender, instance, update_fields, **kwargs):
+    """Изменились ли поля автора, которые попадают в документы.
+
+    Полное сохранение (без update_fields) сравнивается с БД: иначе
+    любое сохранение профиля переписывало бы все рецепты автора.
+    """
+    fields = AUTHOR_FIELDS
+    if update_fields is not None:
+        fields = AUTHOR_FIELDS & set(update_fields)
+    instance.author_fields_changed = False
+    if instance.pk is None or not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance.author_fields_changed = stored is not None and any(
+        getattr(instance, field) != value for field, value in stored.items())
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, **kwargs):
+    if not created and instance.author_fields_changed:
+        touch_recipes(author_id=instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def touch_tag_recipes(sender, instance, **kwargs):
+    touch_recipes(tags=instance)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_recipes(sender, instance, **kwargs):
+    instance.recipe_ids = list(
+        Recipe.objects.filter(tags=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def touch_untagged_recipes(sender, instance, **kwargs):
+    # Документы пересобираются, когда связи с тегом уже удалены.
+    touch_recipes(pk__in=instance.recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_tagged_recipes(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch_recipes(pk=instance.pk)
+    elif pk_set:
+        touch_recipes(pk__in=pk_set)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def reset_recipe_flags(sender, instance, **kwargs):
+    bump_flags_version(instance.user_id)
@@ -0,0 +1,83 @@
+from itertools import groupby
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from foodgram import constants
+from .minhash import band_buckets, index_entry
+from .models import IngredientAmount, RecipeBucket, RecipeSignature
+
+
+def iter_ingredient_sets(recipe_ids=None):
+    """Наборы ингредиентов рецептов одним упорядоченным проходом."""
+    amounts = IngredientAmount.objects.order_by('recipe_id')
+    if recipe_ids is not None:
+        amounts = amounts.filter(recipe_id__in=recipe_ids)
+    rows = amounts.values_list('recipe_id', 'ingredient_id').iterator()
+    for recipe_id, group in groupby(rows, key=lambda row: row[0]):
+        yield recipe_id, [ingredient_id for _, ingredient_id in group]
+
+
+def save_entries(entries):
+    """Замена сигнатур и корзин для пачки рецептов."""
+    recipe_ids = [recipe_id for recipe_id, _, _ in entries]
+    with transaction.atomic():
+        RecipeSignature.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeBucket.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSignature.objects.bulk_create(
+            RecipeSignature(recipe_id=recipe_id, signature=signature)
+            for recipe_id, signature, _ in entries
+            if signature is not None
+        )
+        RecipeBucket.objects.bulk_create(
+            RecipeBucket(recipe_id=recipe_id, band=band, bucket=bucket)
+            for recipe_id, _, buckets in entries
+            for band, bucket in enumerate(buckets)
+        )
+
+
+def delete_stale_entries():
+    """Удаляет сигнатуры и корзины рецептов, оставшихся без ингредиентов.
+
+    Пересборка проходит только по рецептам с ингредиентами и такие
+    записи не заменяет. Возвращает число удалённых сигнатур.
+    """
+    without_amounts = ~Exists(IngredientAmount.objects.filter(
+        recipe_id=OuterRef('recipe_id')))
+    with transaction.atomic():
+        RecipeBucket.objects.filter(without_amounts).delete()
+        deleted, _ = RecipeSignature.objects.filter(
+            without_amounts).delete()
+    return deleted
+
+
+def update_recipe_index(recipe_id):
+    ingredient_ids = list(IngredientAmount.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', flat=True))
+    save_entries([index_entry(recipe_id, ingredient_ids)])
+
+
+def find_similar(recipe_id, limit):
+    """Id похожих рецептов по убыванию оценки коэффициента Жаккара."""
+    signature = RecipeSignature.objects.filter(
+        recipe_id=recipe_id).values_list('signature', flat=True).first()
+    if signature is None:
+        return []
+    target = np.frombuffer(signature, dtype=np.uint32)
+    lookup = Q()
+    for band, bucket in enumerate(band_buckets(target)):
+        lookup |= Q(band=band, bucket=bucket)
+    candidates = RecipeBucket.objects.filter(lookup).exclude(
+        recipe_id=recipe_id).values('recipe_id').distinct()
+    rows = list(RecipeSignature.objects.filter(
+        recipe_id__in=candidates).values_list('recipe_id', 'signature'))
+    if not rows:
+        return []
+    matrix = np.frombuffer(
+        b''.join(bytes(signature) for _, signature in rows),
+        dtype=np.uint32
+    ).reshape(len(rows), constants.MINHASH_PERMUTATIONS)
+    scores = (matrix == target).mean(axis=1)
+    order = np.argsort(-scores, kind='stable')[:limit]
+    return [rows[index][0] for index in order]
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import defaultdict
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from api.cache import bump_count_version
+from api.outbox import publish_many
+from foodgram import constants
+from users.models import User
+from .minhash import index_chunk
+from .models import Ingredient, IngredientAmount, Recipe, Tag
+from .signals import log_changes
+from .similarity import save_entries
+
+RECIPES_FILE = 'recipes.jsonl'
+IMAGES_DIR = 'images'
+READ_BLOCK = 1 << 16
+
+
+def read_state(path):
+    try:
+        with open(path) as state:
+            return json.load(state)
+    except FileNotFoundError:
+        return None
+
+
+def write_state(path, state):
+    """Атомарная запись состояния: прерывание не оставит его битым."""
+    with open(f'{path}.tmp', 'w') as tmp:
+        json.dump(state, tmp)
+    os.replace(f'{path}.tmp', path)
+
+
+def export_image(name, images_dir):
+    """Копия файла в images_dir под именем sha256 содержимого."""
+    if not name:
+        return None
+    digest = hashlib.sha256()
+    try:
+        source = default_storage.open(name, 'rb')
+    except FileNotFoundError:
+        return None
+    with source, tempfile.NamedTemporaryFile(
+        dir=images_dir, delete=False
+    ) as target:
+        for block in iter(lambda: source.read(READ_BLOCK), b''):
+            digest.update(block)
+            target.write(block)
+    filename = digest.hexdigest() + os.path.splitext(name)[1].lower()
+    path = os.path.join(images_dir, filename)
+    if os.path.exists(path):
+        os.unlink(target.name)
+    else:
+        os.replace(target.name, path)
+    return f'{IMAGES_DIR}/{filename}'
+
+
+def export_batch(pks, directory, pool):
+    """Записи рецептов пачки; изображения копируются пулом потоков."""
+    recipes = list(Recipe.objects.filter(pk__in=pks).order_by('pk').values(
+        'pk', 'name', 'text', 'cooking_time', 'pub_date', 'image',
+        'author__email', 'author__username', 'author__first_name',
+        'author__last_name'))
+    tags = defaultdict(list)
+    for recipe_id, name, slug, color in Recipe.tags.through.objects.filter(
+        recipe_id__in=pks
+    ).order_by('pk').values_list(
+        'recipe_id', 'tag__name', 'tag__slug', 'tag__color'
+    ):
+        tags[recipe_id].append(
+            {'name': name, 'slug': slug, 'color': color})
+    ingredients = defaultdict(list)
+    for recipe_id, name, unit, amount in IngredientAmount.objects.filter(
+        recipe_id__in=pks
+    ).order_by('pk').values_list(
+        'recipe_id', 'ingredient__name', 'ingredient__measurement_unit',
+        'amount'
+    ):
+        ingredients[recipe_id].append(
+            {'name': name, 'measurement_unit': unit, 'amount': amount})
+    images_dir = os.path.join(directory, IMAGES_DIR)
+    images = pool.map(
+        lambda name: export_image(name, images_dir),
+        [recipe['image'] for recipe in recipes])
+    for recipe, image in zip(recipes, images):
+        yield {
+            'name': recipe['name'],
+            'text': recipe['text'],
+            'cooking_time': recipe['cooking_time'],
+            # DjangoJSONEncoder обрезает микросекунды, а по дате
+            # повторный импорт узнаёт уже перенесённые рецепты.
+            'pub_date': recipe['pub_date'].isoformat(),
+            'image': image,
+            'author': {
+                'email': recipe['author__email'],
+                'username': recipe['author__username'],
+                'first_name': recipe['author__first_name'],
+                'last_name': recipe['author__last_name'],
+            },
+            'tags': tags[recipe['pk']],
+            'ingredients': ingredients[recipe['pk']],
+        }
+
+
+def dump_record(record):
+    return (json.dumps(
+        record, ensure_ascii=False, separators=(',', ':')) + '\n').encode()
+
+
+def resolve_authors(records):
+    """Авторы по email; недостающие создаются без пароля."""
+    authors = {record['author']['email']: record['author']
+               for record in records}
+    existing = dict(User.objects.filter(
+        email__in=authors).values_list('email', 'pk'))
+    missing = [author for email, author in authors.items()
+               if email not in existing]
+    if missing:
+        taken = set(User.objects.filter(
+            username__in=[author['username'] for author in missing]
+        ).values_list('username', flat=True))
+        users = []
+        for author in missing:
+            username = author['username']
+            if username in taken:
+                suffix = hashlib.sha256(
+                    author['email'].encode()).hexdigest()[:8]
+                username = '{}_{}'.format(
+                    username[:constants.MAX_LENGTH_USERNAME - 9], suffix)
+            users.append(User(
+                email=author['email'], username=username,
+                first_name=author['first_name'],
+                last_name=author['last_name'],
+                password=make_password(None)))
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        bump_count_version(User)
+        existing.update(User.objects.filter(
+            email__in=[author['email'] for author in missing]
+        ).values_list('email', 'pk'))
+    return existing
+
+
+def resolve_tags(records):
+    tags = {tag['slug']: tag
+            for record in records for tag in record['tags']}
+    existing = dict(Tag.objects.filter(
+        slug__in=tags).values_list('slug', 'pk'))
+    missing = [Tag(**tag) for slug, tag in tags.items()
+               if slug not in existing]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        existing.update(Tag.objects.filter(
+            slug__in=[tag.slug for tag in missing]
+        ).values_list('slug', 'pk'))
+    return existing
+
+
+def resolve_ingredients(records):
+    """Ингредиенты по паре (название, единица измерения)."""
+    keys = {(item['name'], item['measurement_unit'])
+            for record in records for item in record['ingredients']}
+
+    def load():
+        rows = Ingredient.objects.filter(
+            name__in={name for name, _ in keys}
+        ).order_by('-pk').values_list('name', 'measurement_unit', 'pk')
+        # При дублях побеждает самый ранний ингредиент.
+        return {(name, unit): pk for name, unit, pk in rows}
+
+    existing = load()
+    missing = keys - existing.keys()
+    if missing:
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in sorted(missing))
+        existing = load()
+    return existing
+
+
+def import_image(path, directory):
+    """Файл из выгрузки в хранилище; одинаковое содержимое не дублируется."""
+    if not path:
+        return ''
+    filename = os.path.basename(path)
+    name = f'recipes/{filename}'
+    if default_storage.exists(name):
+        return name
+    with open(os.path.join(directory, IMAGES_DIR, filename), 'rb') as source:
+        return default_storage.save(name, File(source))
+
+
+def create_recipes(recipes):
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Recipe.objects.bulk_create(recipes)
+    # Без RETURNING массовая вставка не вернёт id.
+    for recipe in recipes:
+        recipe.save()
+    return recipes
+
+
+def import_batch(records, directory, pool):
+    """Импорт пачки записей; уже перенесённые рецепты пропускаются.
+
+    Рецепт считается перенесённым, если у автора уже есть рецепт
+    с тем же названием и датой публикации, поэтому повторный запуск
+    после прерывания не создаёт дублей. Как и при создании через API,
+    на каждый рецепт публикуется recipe.created: воркер outbox
+    разложит его по лентам подписчиков автора.
+    """
+    authors = resolve_authors(records)
+    for record in records:
+        record['author_id'] = authors[record['author']['email']]
+        record['pub_date'] = parse_datetime(record['pub_date'])
+    existing = set(Recipe.objects.filter(
+        author_id__in={record['author_id'] for record in records},
+        pub_date__in={record['pub_date'] for record in records},
+    ).values_list('author_id', 'name', 'pub_date'))
+    fresh, seen = [], set()
+    for record in records:
+        key = (record['author_id'], record['name'], record['pub_date'])
+        if key not in existing and key not in seen:
+            seen.add(key)
+            fresh.append(record)
+    if not fresh:
+        return 0
+    tags = resolve_tags(fresh)
+    ingredients = resolve_ingredients(fresh)
+    images = list(pool.map(
+        lambda path: import_image(path, directory),
+        [record['image'] for record in fresh]))
+    with transaction.atomic():
+        recipes = create_recipes([
+            Recipe(
+                author_id=record['author_id'], name=record['name'],
+                text=record['text'], cooking_time=record['cooking_time'],
+                image=image)
+            for record, image in zip(fresh, images)
+        ])
+        # auto_now_add подменяет дату при вставке — возвращаем исходную.
+        for recipe, record in zip(recipes, fresh):
+            recipe.pub_date = record['pub_date']
+        Recipe.objects.bulk_update(recipes, ['pub_date'])
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=recipe, amount=item['amount'],
+                ingredient_id=ingredients[
+                    item['name'], item['measurement_unit']])
+            for recipe, record in zip(recipes, fresh)
+            for item in record['ingredients']
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag_id=tags[tag['slug']])
+            for recipe, record in zip(recipes, fresh)
+            for tag in record['tags'] if tag['slug'] in tags
+        )
+        log_changes([recipe.pk for recipe in recipes])
+        publish_many('recipe.created', [recipe.pk for recipe in recipes])
+    save_entries(index_chunk([
+        (recipe.pk, [ingredients[item['name'], item['measurement_unit']]
+                     for item in record['ingredients']])
+        for recipe, record in zip(recipes, fresh)
+    ]))
+    return len(recipes)
@@ -0,0 +1,46 @@
+from itertools import islice
+
+from foodgram import constants
+
+
+def iter_pk_batches(queryset, size=constants.BULK_DELETE_BATCH_SIZE):
+    """Пачки первичных ключей по возрастанию без OFFSET."""
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        batch = queryset
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        pks = list(batch.values_list('pk', flat=True)[:size])
+        if not pks:
+            return
+        yield pks
+        last = pks[-1]
+
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def delete_older_than(queryset, field, cutoff,
+                      size=constants.BULK_DELETE_BATCH_SIZE):
+    """Удаляет строки, у которых field раньше cutoff, пачками.
+
+    Идёт от младших ключей и останавливается на первой свежей строке:
+    время записи растёт вместе с ключом, поэтому индекс по field
+    не нужен.
+    """
+    queryset = queryset.order_by('pk')
+    deleted = 0
+    while True:
+        rows = list(queryset.values_list('pk', field)[:size])
+        expired = [pk for pk, value in rows if value < cutoff]
+        if expired:
+            deleted += queryset.filter(pk__in=expired).delete()[0]
+        if len(expired) < size:
+            return deleted
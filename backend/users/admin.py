@@ -1,16 +1,26 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from recipes.admin import FastDeleteMixin
+from recipes.deletion import delete_user_account
 from . import models
 
 
-class UserAdmin(UserAdmin):
+class UserAdmin(FastDeleteMixin, UserAdmin):
     list_display = (
         'username', 'pk', 'email', 'password', 'first_name', 'last_name',
     )
     list_filter = ('username', 'email')
     search_fields = ('username', 'email')
     empty_value_display = '???'
+    actions = ('fast_delete',)
+
+    def delete_model(self, request, obj):
+        delete_user_account(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            delete_user_account(user)
 
 
 class FollowAdmin(admin.ModelAdmin):
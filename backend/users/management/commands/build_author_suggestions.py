@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand
+
+from foodgram import constants
+from users.suggestions import rebuild_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации авторов для подписки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=constants.SUGGESTIONS_TOP_K)
+        parser.add_argument(
+            '--favorite-weight', type=float,
+            default=constants.SUGGESTIONS_FAVORITE_WEIGHT)
+        parser.add_argument(
+            '--block-size', type=int,
+            default=constants.SUGGESTIONS_BLOCK_SIZE)
+
+    def handle(self, *args, **options):
+        total = rebuild_suggestions(
+            options['top_k'], options['favorite_weight'],
+            options['block_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Сохранено рекомендаций: {total}.'))
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+FIELDS = ('username', 'first_name', 'last_name')
+
+
+def create_indexes(apps, schema_editor):
+    # Django 3.2 не умеет задавать opclass для индексов по выражениям,
+    # а без text_pattern_ops PostgreSQL не использует индекс для LIKE
+    # при отличной от C локали.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS users_user_{field}_lower_prefix '
+            f'ON users_user (lower({field}) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in FIELDS:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS users_user_{field}_lower_prefix')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_authorsuggestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
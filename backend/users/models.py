@@ -38,6 +38,15 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def refresh_from_db(self, using=None, fields=None):
+        # Пользователь из кеша токенов содержит только id: при первом
+        # обращении к отложенному полю догружаются все отложенные поля
+        # одним запросом, а не по запросу на каждое.
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields)
+
 
 class Follow(models.Model):
     """Класс подписок."""
@@ -64,3 +73,36 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'
+
+
+class AuthorSuggestion(models.Model):
+    """Рекомендация автора для подписки, рассчитанная офлайн."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='author_suggestions',
+        verbose_name='Пользователь')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор')
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_author_suggestion'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='suggestion_user_score_idx'),
+        ]
+        verbose_name = 'Рекомендация автора'
+        verbose_name_plural = 'Рекомендации авторов'
+
+    def __str__(self):
+        return f'{self.author} для {self.user}'
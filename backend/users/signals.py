@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token
+from api.cache import bump_count_version
+from api.conditional import bump_flags_version
+from .models import Follow, User
+
+
+@receiver(post_delete, sender=Token)
+def reset_token_cache(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def reset_user_tokens_cache(sender, instance, created, update_fields,
+                            **kwargs):
+    # У нового пользователя токенов нет, а вход меняет только
+    # last_login, который из кеша не читается.
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    for key in Token.objects.filter(
+            user_id=instance.pk).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+@receiver((post_save, post_delete), sender=User)
+def reset_user_counts(sender, **kwargs):
+    bump_count_version(User)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def reset_follow_flags(sender, instance, **kwargs):
+    bump_flags_version(instance.user_id)
@@ -0,0 +1,87 @@
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from foodgram import constants
+from recipes.models import Favorite
+from .models import AuthorSuggestion, Follow
+
+
+def load_edges(queryset, *fields):
+    """Пары id из таблицы в массив формы (N, 2) без списков кортежей."""
+    rows = queryset.order_by().values_list(*fields).iterator()
+    return np.fromiter(
+        chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+
+
+def build_matrix(edges, index, size):
+    return sparse.csr_matrix(
+        (np.ones(len(edges)),
+         (np.searchsorted(index, edges[:, 0]),
+          np.searchsorted(index, edges[:, 1]))),
+        shape=(size, size))
+
+
+def compute_suggestions(top_k, favorite_weight, block_size):
+    """Рекомендации авторов по совместным подпискам и избранному.
+
+    Интересы пользователя I = F + w * V, где F — подписки, V — авторы
+    избранных рецептов. Близость авторов S = I^T I, оценка кандидатов
+    для блока пользователей — I[block] S. Уже отслеживаемые авторы и
+    сам пользователь исключаются, остаётся top-K по оценке.
+    """
+    follows = load_edges(Follow.objects.all(), 'user_id', 'author_id')
+    favorites = load_edges(
+        Favorite.objects.all(), 'user_id', 'recipe__author_id')
+    index = np.unique(np.concatenate((follows.ravel(), favorites.ravel())))
+    size = len(index)
+    if not size:
+        return
+    follow_matrix = build_matrix(follows, index, size)
+    favorite_matrix = build_matrix(favorites, index, size)
+    favorite_matrix.data[:] = 1
+    interests = (follow_matrix + favorite_weight * favorite_matrix).tocsr()
+    similarity = (interests.T @ interests).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    for start in range(0, size, block_size):
+        scores = (interests[start:start + block_size] @ similarity).tocsr()
+        for offset in range(scores.shape[0]):
+            row = start + offset
+            begin, end = scores.indptr[offset], scores.indptr[offset + 1]
+            columns = scores.indices[begin:end]
+            values = scores.data[begin:end]
+            followed = follow_matrix.indices[
+                follow_matrix.indptr[row]:follow_matrix.indptr[row + 1]]
+            keep = (columns != row) & ~np.isin(columns, followed)
+            columns, values = columns[keep], values[keep]
+            if len(values) > top_k:
+                best = np.argpartition(-values, top_k)[:top_k]
+                columns, values = columns[best], values[best]
+            for column, value in zip(columns, values):
+                yield AuthorSuggestion(
+                    user_id=int(index[row]),
+                    author_id=int(index[column]),
+                    score=float(value))
+
+
+@transaction.atomic
+def rebuild_suggestions(top_k=constants.SUGGESTIONS_TOP_K,
+                        favorite_weight=constants.SUGGESTIONS_FAVORITE_WEIGHT,
+                        block_size=constants.SUGGESTIONS_BLOCK_SIZE):
+    """Полная замена таблицы рекомендаций в одной транзакции."""
+    AuthorSuggestion.objects.all().delete()
+    suggestions = compute_suggestions(top_k, favorite_weight, block_size)
+    total = 0
+    while True:
+        batch = [
+            suggestion for _, suggestion in zip(
+                range(constants.SUGGESTIONS_BATCH_SIZE), suggestions)
+        ]
+        if not batch:
+            return total
+        AuthorSuggestion.objects.bulk_create(batch)
+        total += len(batch)
@@ -0,0 +1,32 @@
+import http from 'k6/http';
+import { check } from 'k6';
+
+const BASE_URL = __ENV.BASE_URL || 'http://nginx';
+
+export const options = {
+  scenarios: {
+    anonymous: {
+      executor: 'constant-arrival-rate',
+      rate: Number(__ENV.RATE || 200),
+      timeUnit: '1s',
+      duration: __ENV.DURATION || '1m',
+      preAllocatedVUs: 50,
+      maxVUs: 200,
+    },
+  },
+  thresholds: {
+    http_req_failed: ['rate<0.01'],
+    http_req_duration: ['p(95)<200'],
+  },
+};
+
+const paths = ['/api/recipes/', '/api/recipes/?page=2', '/api/tags/',
+  '/api/ingredients/?name=с'];
+
+export default function () {
+  const path = paths[Math.floor(Math.random() * paths.length)];
+  const res = http.get(`${BASE_URL}${path}`, {
+    headers: { 'Accept-Encoding': 'gzip' },
+  });
+  check(res, { 'status is 200': (r) => r.status === 200 });
+}